@@ -0,0 +1,82 @@
+"""Micro-benchmark: HTML extraction throughput of the BeautifulSoup path vs the lxml fast path.
+
+    python benchmarks/extract_bench.py saved_pages/          # directory of saved .html files
+    python benchmarks/extract_bench.py --synthetic 200       # generated pages
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bs4 import BeautifulSoup
+from utils.extract import extract_bs4, extract_lxml
+
+
+def baseline_bs4(html: str, url: str):
+    """The original crawl_website parsing: get_text and find_all on a html.parser soup."""
+    soup = BeautifulSoup(html, 'html.parser')
+    text = soup.get_text(separator=' ', strip=True)
+    links = [urljoin(url, link['href']) for link in soup.find_all('a', href=True)]
+    return text, links
+
+
+def synthetic_pages(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = "cloud ai generative salesforce oracle sap digital transformation platform data".split()
+    pages = []
+    for i in range(count):
+        body = "".join(
+            f"<section><h2>{' '.join(rng.choices(words, k=4))}</h2>"
+            f"<p>{' '.join(rng.choices(words, k=120))} <a href='/p{rng.randrange(count)}'>more</a></p></section>"
+            for _ in range(12))
+        pages.append(
+            "<html><head><title>Page</title><script>var x = 1;</script><style>p{color:red}</style></head>"
+            f"<body><nav><a href='/'>Home</a><a href='/about'>About</a></nav>{body}"
+            "<footer>© CloudJune</footer></body></html>")
+    return pages
+
+
+def bench(name, extractor, pages, repeat):
+    total_bytes = sum(len(p.encode("utf-8")) for p in pages) * repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extractor(html, "https://example.com/")
+    elapsed = time.perf_counter() - started
+    count = len(pages) * repeat
+    print(f"{name:<14} {elapsed / count * 1000:8.2f} ms/page {count / elapsed:9.1f} pages/s "
+          f"{total_bytes / elapsed / 1e6:7.2f} MB/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages_dir", nargs="?", help="directory of saved .html pages")
+    parser.add_argument("--synthetic", type=int, default=100, help="number of generated pages when no directory is given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pages_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.pages_dir, "*.htm*"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    else:
+        pages = synthetic_pages(args.synthetic)
+    if not pages:
+        sys.exit("No pages to benchmark.")
+
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.2f} MB, x{args.repeat}")
+    base = bench("bs4 (current)", baseline_bs4, pages, args.repeat)
+    bench("bs4 one-pass", extract_bs4, pages, args.repeat)
+    fast = bench("lxml", extract_lxml, pages, args.repeat)
+    print(f"lxml speed-up over current path: {base / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
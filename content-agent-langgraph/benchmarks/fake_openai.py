@@ -0,0 +1,177 @@
+"""Local stand-in for the OpenAI chat, image and embedding endpoints.
+
+    python benchmarks/fake_openai.py --port 8099 --latency 0.5 --rate-limit-every 5
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake python src/agent.py --batch topics.txt
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_social import PNG_1X1
+
+
+# Prompt-prefix caching as the real API does it: prompts of at least 1024 tokens reuse the
+# longest previously seen prefix, in 128-token steps (~4 characters per token)
+PREFIX_CACHE_MIN_CHARS = 1024 * 4
+PREFIX_CACHE_STEP_CHARS = 128 * 4
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    rate_limit_every = 0
+    _calls = 0
+    _lock = threading.Lock()
+    _prefixes = set()
+    # Totals across chat calls, for benchmarks to report
+    prompt_tokens_total = 0
+    cached_tokens_total = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # Generated image URLs point back here so posting them downloads a real (tiny) PNG
+        if not self.path.startswith("/images/"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG_1X1)))
+        self.end_headers()
+        self.wfile.write(PNG_1X1)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self._lock:
+            FakeOpenAIHandler._calls += 1
+            call = FakeOpenAIHandler._calls
+        if self.rate_limit_every and call % self.rate_limit_every == 0:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {"Retry-After": "0.2"})
+            return
+        time.sleep(self.latency)
+        if self.path.endswith("/chat/completions") and request.get("stream"):
+            self._stream(self._chat(request))
+        elif self.path.endswith("/chat/completions"):
+            self._send(200, self._chat(request))
+        elif self.path.endswith("/images/generations"):
+            digest = hashlib.sha256(request.get("prompt", "").encode("utf-8")).hexdigest()[:16]
+            self._send(200, {"created": int(time.time()), "data": [{"url": f"http://{self.headers['Host']}/images/{digest}.png"}]})
+        elif self.path.endswith("/embeddings"):
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            data = [{"object": "embedding", "index": i, "embedding": self._embed(text)} for i, text in enumerate(inputs)]
+            self._send(200, {"object": "list", "data": data, "model": request.get("model"),
+                             "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _stream(self, completion):
+        """Server-sent events, one chunk per word, like the real streaming API."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        text = completion["choices"][0]["message"]["content"]
+        for word in text.split(" "):
+            chunk = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                     "model": completion["model"],
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.latency / 50)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    @staticmethod
+    def _embed(text, dim=64):
+        digest = hashlib.sha256(text.encode("utf-8")).digest() * (dim // 32)
+        return [b / 255.0 for b in digest[:dim]]
+
+    @staticmethod
+    def _variant(platform, topic, candidate, rewrite):
+        body = f"{topic} is changing how enterprises operate. We help teams adopt it safely."
+        if platform == "twitter":
+            # The first candidate of a fresh request runs long, as real ones often do, so
+            # clients exercise their length check and targeted re-request
+            return body + (" More on our blog." if rewrite or candidate else " Here is why that matters to you." * 8)
+        if platform == "instagram":
+            return body + " Swipe to learn more.\n#cloud #ai #enterprise #digitaltransformation #cloudjune"
+        return f"What {topic} means for your business in 2025.\n\n" + body + " Talk to us today."
+
+    @classmethod
+    def _cached_chars(cls, prompt):
+        """Length of the longest prefix of `prompt` cached by earlier calls; caches this one's."""
+        steps = range(PREFIX_CACHE_MIN_CHARS, len(prompt) + 1, PREFIX_CACHE_STEP_CHARS)
+        keys = [(n, hashlib.sha256(prompt[:n].encode("utf-8")).digest()) for n in steps]
+        with cls._lock:
+            cached = max((n for n, key in keys if key in cls._prefixes), default=0)
+            cls._prefixes.update(key for _, key in keys)
+        return cached
+
+    def _chat(self, request):
+        prompt = request["messages"][-1]["content"]
+        topic = next((line[len("Topic:"):].strip() for line in prompt.splitlines() if line.strip().startswith("Topic:")), "our work")
+        keys_line = next((line for line in prompt.splitlines() if "Return a JSON object" in line), None)
+        if keys_line:
+            platforms = re.findall(r'"(\w+)"', keys_line)
+            rewrite = "rejected because" in prompt
+            texts = [json.dumps({p: self._variant(p, topic, i, rewrite) for p in platforms})
+                     for i in range(request.get("n", 1))]
+        else:
+            texts = [f"CAPTION: What {topic} means for your business in 2025.\n"
+                     f"CONTENT: {topic} is changing how enterprises operate. " + "We help teams adopt it safely. " * 8
+                     ] * request.get("n", 1)
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = self._cached_chars(prompt) // 4
+        completion_tokens = sum(len(t) for t in texts) // 4
+        with self._lock:
+            FakeOpenAIHandler.prompt_tokens_total += prompt_tokens
+            FakeOpenAIHandler.cached_tokens_total += cached_tokens
+        return {
+            "id": f"chatcmpl-fake-{FakeOpenAIHandler._calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}
+                        for i, text in enumerate(texts)],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+        }
+
+
+def serve(port: int = 8099, latency: float = 0.2, rate_limit_every: int = 0):
+    """Start the fake server on a background thread and return it."""
+    handler = type("Handler", (FakeOpenAIHandler,), {"latency": latency, "rate_limit_every": rate_limit_every})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth call with a 429")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.rate_limit_every)
+    print(f"Fake OpenAI API on http://127.0.0.1:{args.port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
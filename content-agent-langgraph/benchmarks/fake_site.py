@@ -0,0 +1,173 @@
+"""Synthetic website served locally, standing in for cloudjune.com in crawl benchmarks.
+
+    python benchmarks/fake_site.py --port 8096 --pages 500 --page-kb 40 --fanout 12
+
+Pages are generated deterministically from a seed: /p0 … /pN-1, each about --page-kb of
+HTML with shared nav/footer boilerplate and --fanout links to other pages. Like real sites,
+links to the same page come in several spellings (trailing slash, #fragment, ?utm_source).
+Responses carry an ETag and honour If-None-Match, so revalidating crawls see 304s. The site
+also serves /robots.txt (with --crawl-delay, if given) and a /sitemap.xml listing every page
+with a lastmod.
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("cloud ai generative salesforce oracle sap digital transformation platform data "
+         "migration analytics security integration automation enterprise services consulting").split()
+
+
+class SyntheticSite:
+    """Deterministic set of interlinked HTML pages, keyed by path."""
+
+    # Spellings of the same link, as a CMS and a newsletter tool would scatter them
+    LINK_VARIANTS = ("/p{0}", "/p{0}/", "/p{0}#details", "/p{0}?utm_source=newsletter")
+
+    def __init__(self, pages: int = 200, page_kb: int = 20, fanout: int = 8, seed: int = 7,
+                 crawl_delay: float = None):
+        self.pages = pages
+        self.page_kb = page_kb
+        self.fanout = fanout
+        self.seed = seed
+        self.crawl_delay = crawl_delay
+        # Page N was last modified N hours before this fixed date
+        self.epoch = 1_700_000_000
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def paths(self):
+        return [f"/p{i}" for i in range(self.pages)]
+
+    def page(self, path: str):
+        """HTML for `path` ("/" is page 0), or None if there is no such page."""
+        if path == "/":
+            path = "/p0"
+        path = path.rstrip("/")
+        if not path.startswith("/p") or not path[2:].isdigit() or int(path[2:]) >= self.pages:
+            return None
+        with self._lock:
+            if path not in self._cache:
+                self._cache[path] = self._render(int(path[2:]))
+            return self._cache[path]
+
+    def lastmod(self, number: int) -> float:
+        return self.epoch - number * 3600
+
+    def robots_txt(self, base_url: str) -> str:
+        lines = ["User-agent: *", "Disallow: /private/"]
+        if self.crawl_delay:
+            lines.append(f"Crawl-delay: {self.crawl_delay:g}")
+        lines.append(f"Sitemap: {base_url}/sitemap.xml")
+        return "\n".join(lines) + "\n"
+
+    def sitemap_xml(self, base_url: str) -> str:
+        entries = "".join(
+            "<url><loc>{0}/p{1}</loc><lastmod>{2}</lastmod></url>".format(
+                base_url, i, datetime.fromtimestamp(self.lastmod(i), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00"))
+            for i in range(self.pages))
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + entries + "</urlset>")
+
+    def _render(self, number: int) -> str:
+        rng = random.Random(self.seed * 1_000_003 + number)
+        links = "".join("<li><a href='{0}'>Related {1}</a></li>".format(
+            rng.choice(self.LINK_VARIANTS).format(rng.randrange(self.pages)), i) for i in range(self.fanout))
+        sections, size = [], 0
+        while size < self.page_kb * 1024:
+            section = (f"<section><h2>{' '.join(rng.choices(WORDS, k=4))}</h2>"
+                       f"<p>{' '.join(rng.choices(WORDS, k=120))}</p></section>")
+            sections.append(section)
+            size += len(section)
+        return ("<html><head><title>Page {0}</title><script>var x = 1;</script><style>p{{color:red}}</style></head>"
+                "<body><nav><a href='/'>Home</a><a href='/p1'>About</a><a href='/p2'>Services</a></nav>"
+                "<h1>Page {0}</h1>{1}<ul>{2}</ul>"
+                "<footer>© CloudJune. All rights reserved. Contact us for a consultation.</footer></body></html>"
+                ).format(number, "".join(sections), links)
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    site = None
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY each keep-alive
+    # response stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    requests_seen = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self._lock:
+            FakeSiteHandler.requests_seen += 1
+        time.sleep(self.latency)
+        path = self.path.split("?")[0]
+        base_url = f"http://{self.headers.get('Host')}"
+        if path == "/robots.txt":
+            return self._send_text(self.site.robots_txt(base_url), "text/plain")
+        if path == "/sitemap.xml":
+            return self._send_text(self.site.sitemap_xml(base_url), "application/xml")
+        html = self.site.page(path)
+        if html is None:
+            self.send_response(404)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", "9")
+            self.end_headers()
+            self.wfile.write(b"Not found")
+            return
+        data = html.encode("utf-8")
+        etag = '"' + hashlib.sha256(data).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, text: str, content_type: str):
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port: int = 8096, pages: int = 200, page_kb: int = 20, fanout: int = 8, latency: float = 0.0, seed: int = 7,
+          crawl_delay: float = None):
+    """Start the site on a background thread and return the server (its SyntheticSite is server.site)."""
+    site = SyntheticSite(pages, page_kb, fanout, seed, crawl_delay)
+    handler = type("Handler", (FakeSiteHandler,), {"site": site, "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.site = site
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8096)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-kb", type=int, default=20, help="approximate HTML size of each page")
+    parser.add_argument("--fanout", type=int, default=8, help="links from each page to other pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--crawl-delay", type=float, default=None, help="Crawl-delay advertised in robots.txt")
+    args = parser.parse_args()
+    server = serve(args.port, args.pages, args.page_kb, args.fanout, args.latency, crawl_delay=args.crawl_delay)
+    print(f"Synthetic site with {args.pages} pages on http://127.0.0.1:{args.port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,186 @@
+"""Local stub of the Graph API, LinkedIn v2 and Twitter v1.1 endpoints used by utils/social_media.py.
+
+    python benchmarks/fake_social.py --port 8097 --latency 0.1 --fail-every 4
+    GRAPH_API_BASE=http://127.0.0.1:8097/graph LINKEDIN_API_BASE=http://127.0.0.1:8097/linkedin \
+        TWITTER_API_BASE=http://127.0.0.1:8097/twitter python src/agent.py
+
+--fail-every N answers every Nth request with 503 + Retry-After to exercise client retries.
+--container-delay S keeps Instagram containers IN_PROGRESS for S seconds; publishing one
+before then fails as it does on Graph. The Graph batch endpoint (POST /graph/ with batch=)
+is supported.
+"""
+import argparse
+import itertools
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+def _png(width: int, height: int) -> bytes:
+    """A valid RGB PNG of one flat colour, small enough to serve from memory."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x1f\x6f\xb4" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+# A tiny valid PNG, served for any /images/ path
+PNG_1X1 = _png(1, 1)
+
+
+class FakeSocialHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+    fail_every = 0
+    container_delay = 0.0
+    containers = {}
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY each keep-alive
+    # response stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    _ids = itertools.count(1000)
+    _calls = itertools.count(1)
+    requests_seen = []
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None, raw=None, content_type="application/json"):
+        data = raw if raw is not None else json.dumps(body or {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _handle(self, method):
+        body = self._body()
+        path = urlparse(self.path).path
+        with self._lock:
+            FakeSocialHandler.requests_seen.append((method, path, len(body)))
+        if self.fail_every and next(self._calls) % self.fail_every == 0:
+            self._send(503, {"error": {"message": "Service temporarily unavailable"}}, {"Retry-After": "0.1"})
+            return
+        time.sleep(self.latency)
+        new_id = str(next(self._ids))
+
+        if path.startswith("/images/"):
+            self._send(200, raw=PNG_1X1, content_type="image/png")
+        elif path.startswith("/graph/"):
+            self._graph(method, path[len("/graph/"):], new_id, body)
+        elif path.startswith("/linkedin/"):
+            self._linkedin(method, path[len("/linkedin/"):], new_id)
+        elif path.startswith("/twitter/"):
+            self._twitter(method, path[len("/twitter/"):], new_id)
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def _graph(self, method, path, new_id, body):
+        params = {}
+        if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+            params = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+        params.update({key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()})
+        if path == "" and method == "POST" and "batch" in params:
+            self._send(200, self._graph_batch(json.loads(params["batch"])))
+            return
+        status, result = self._graph_call(method, path, params, new_id)
+        self._send(status, result)
+
+    def _graph_batch(self, operations):
+        """Graph batch endpoint: each operation runs as if sent alone; bodies come back as JSON strings."""
+        responses = []
+        for operation in operations:
+            url = urlparse(operation["relative_url"])
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            params.update({key: values[0] for key, values in parse_qs(operation.get("body", "")).items()})
+            status, result = self._graph_call(operation["method"], url.path.strip("/"), params, str(next(self._ids)))
+            responses.append({"code": status, "body": json.dumps(result)})
+        return responses
+
+    def _graph_call(self, method, path, params, new_id):
+        edge = path.rsplit("/", 1)[-1]
+        if edge in ("photos", "feed"):
+            return 200, {"id": new_id, "post_id": f"page_{new_id}"}
+        if edge == "media":
+            # Containers take container_delay seconds to process, like real uploads
+            with self._lock:
+                FakeSocialHandler.containers[new_id] = time.monotonic() + self.container_delay
+            return 200, {"id": new_id}
+        if edge == "media_publish":
+            ready_at = self.containers.get(params.get("creation_id"))
+            if ready_at is None or ready_at > time.monotonic():
+                return 400, {"error": {"message": "Media ID is not available", "type": "OAuthException",
+                                       "code": 9007, "error_subcode": 2207027}}
+            return 200, {"id": new_id}
+        container_id = path.split("/")[0]
+        ready_at = self.containers.get(container_id, 0.0)
+        return 200, {"id": container_id, "status_code": "FINISHED" if ready_at <= time.monotonic() else "IN_PROGRESS"}
+
+    def _linkedin(self, method, path, new_id):
+        host = self.headers["Host"]
+        if path == "assets" and "registerUpload" in parse_qs(urlparse(self.path).query).get("action", []):
+            self._send(200, {"value": {
+                "asset": f"urn:li:digitalmediaAsset:{new_id}",
+                "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {
+                    "uploadUrl": f"http://{host}/linkedin/upload/{new_id}"}},
+            }})
+        elif path.startswith("upload/") and method == "PUT":
+            self._send(201, {})
+        elif path == "ugcPosts":
+            self._send(201, {"id": f"urn:li:share:{new_id}"}, {"x-restli-id": f"urn:li:share:{new_id}"})
+        else:
+            self._send(404, {"message": f"Unknown LinkedIn path {path}"})
+
+    def _twitter(self, method, path, new_id):
+        if path == "statuses/update.json" and method == "POST":
+            if not self.headers.get("Authorization", "").startswith("OAuth "):
+                self._send(401, {"errors": [{"code": 32, "message": "Could not authenticate you."}]})
+                return
+            self._send(200, {"id": int(new_id), "id_str": new_id})
+        else:
+            self._send(404, {"errors": [{"code": 34, "message": f"Unknown Twitter path {path}"}]})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+
+def serve(port: int = 8097, latency: float = 0.05, fail_every: int = 0, container_delay: float = 0.0):
+    """Start the stub on a background thread and return it."""
+    handler = type("Handler", (FakeSocialHandler,), {"latency": latency, "fail_every": fail_every,
+                                                     "container_delay": container_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--container-delay", type=float, default=0.0,
+                        help="seconds an Instagram container stays IN_PROGRESS before it can be published")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.fail_every, args.container_delay)
+    print(f"Fake Graph API on http://127.0.0.1:{args.port}/graph, LinkedIn on http://127.0.0.1:{args.port}/linkedin, "
+          f"Twitter on http://127.0.0.1:{args.port}/twitter")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
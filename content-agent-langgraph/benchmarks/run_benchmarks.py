@@ -0,0 +1,225 @@
+"""Offline benchmark suite. Starts local stand-ins for the website (fake_site.py), OpenAI
+(fake_openai.py) and the social APIs (fake_social.py), runs each scenario against the real
+code paths and prints one JSON document to stdout, so runs can be diffed across versions.
+
+    python benchmarks/run_benchmarks.py > before.json
+    python benchmarks/run_benchmarks.py --scenarios crawl,parse --pages 500 --page-kb 40 > after.json
+
+Scenarios:
+    crawl     crawl_website pages/s, cold and then revalidating against the crawl store
+    parse     HTML extraction throughput of each extractor on the synthetic pages
+    generate  generate_post end-to-end latency (fresh, streamed TTFT, cached), prompt
+              tokens per call and the share served from the prompt-prefix cache
+    publish   post_to_platforms fan-out time across all four platforms
+
+Progress output from the code under test goes to stderr.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+import fake_openai
+import fake_site
+import fake_social
+
+SCENARIOS = ["crawl", "parse", "generate", "publish"]
+SITE_PORT, OPENAI_PORT, SOCIAL_PORT = 8096, 8099, 8097
+
+
+def configure_environment(args, cache_dir):
+    """Point every client at the stand-ins. Must run before any utils module is imported,
+    since they read their endpoints and tuning from the environment at import time."""
+    social = f"http://127.0.0.1:{SOCIAL_PORT}"
+    os.environ.update({
+        "CONTENT_AGENT_CACHE_DIR": cache_dir,
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{OPENAI_PORT}/v1",
+        "GRAPH_API_BASE": f"{social}/graph",
+        "LINKEDIN_API_BASE": f"{social}/linkedin",
+        "TWITTER_API_BASE": f"{social}/twitter",
+        "EMBEDDER": args.embedder,
+        "CRAWL_HOST_DELAY": str(args.host_delay),
+    })
+    for name in ("FACEBOOK_PAGE_ID", "FACEBOOK_PAGE_TOKEN", "INSTAGRAM_USER_ID", "COMPANY_URN",
+                 "TWITTER_CONSUMER_KEY", "TWITTER_CONSUMER_SECRET", "TWITTER_ACCESS_TOKEN", "TWITTER_ACCESS_SECRET"):
+        os.environ[name] = "fake"
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def bench_crawl(args, site_url, cache_dir):
+    from utils.crawl_store import CrawlStore
+    from utils.crawler import crawl_website
+
+    store = CrawlStore(os.path.join(cache_dir, "bench_crawl.db"))
+    result = {}
+    for phase in ("cold", "revalidate"):
+        seen = fake_site.FakeSiteHandler.requests_seen
+        started = time.perf_counter()
+        pages = crawl_website(site_url, max_pages=args.pages, store=store)
+        elapsed = time.perf_counter() - started
+        requests_made = fake_site.FakeSiteHandler.requests_seen - seen
+        result[phase] = {
+            "pages": len(pages),
+            "requests": requests_made,
+            "requests_per_page": requests_made / len(pages) if pages else 0.0,
+            "seconds": elapsed,
+            "pages_per_sec": len(pages) / elapsed if elapsed else 0.0,
+        }
+    store.close()
+    return result
+
+
+def bench_parse(args, site):
+    from utils.extract import EXTRACTORS
+
+    pages = [site.page(path) for path in site.paths()[:args.pages]]
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages)
+    result = {}
+    for name, extract in EXTRACTORS.items():
+        started = time.perf_counter()
+        for html in pages:
+            extract(html, "http://127.0.0.1/")
+        elapsed = time.perf_counter() - started
+        result[name] = {"pages": len(pages), "pages_per_sec": len(pages) / elapsed,
+                        "mb_per_sec": total_bytes / elapsed / 1e6}
+    return result
+
+
+def bench_generate(args, agent):
+    topics = [f"benchmark topic {i}" for i in range(args.runs)]
+    fresh, ttft, cached = [], [], []
+    prompt_tokens, cached_tokens = fake_openai.FakeOpenAIHandler.prompt_tokens_total, fake_openai.FakeOpenAIHandler.cached_tokens_total
+    for topic in topics:
+        started = time.perf_counter()
+        agent.generate_post(topic, force=True)
+        fresh.append(time.perf_counter() - started)
+    prompt_tokens = fake_openai.FakeOpenAIHandler.prompt_tokens_total - prompt_tokens
+    cached_tokens = fake_openai.FakeOpenAIHandler.cached_tokens_total - cached_tokens
+    for topic in topics:
+        agent.generate_post(topic, force=True, stream=True)
+        if agent.last_ttft is not None:
+            ttft.append(agent.last_ttft)
+    for topic in topics:
+        started = time.perf_counter()
+        agent.generate_post(topic)
+        cached.append(time.perf_counter() - started)
+    return {
+        "fresh_seconds": summarize(fresh),
+        "stream_ttft_seconds": summarize(ttft) if ttft else None,
+        "cached_seconds": summarize(cached),
+        "prompt_tokens_per_call": prompt_tokens / len(topics),
+        "uncached_prompt_tokens_per_call": (prompt_tokens - cached_tokens) / len(topics),
+        "openai_latency": args.openai_latency,
+    }
+
+
+def bench_publish(args, agent):
+    from utils.publisher import ALL_PLATFORMS
+
+    image_url = f"http://127.0.0.1:{SOCIAL_PORT}/images/bench.png"
+    fanout, per_platform, failures = [], {}, 0
+    for i in range(args.runs):
+        started = time.perf_counter()
+        # A distinct caption per run, or the outbox would (rightly) skip repeats as already posted
+        results = agent.post_to_platforms(f"Benchmark post {time.time_ns()}-{i}", "Body", image_url, list(ALL_PLATFORMS))
+        fanout.append(time.perf_counter() - started)
+        for result in results:
+            per_platform.setdefault(result.platform, []).append(result.latency)
+            failures += result.status != "success"
+    return {
+        "fanout_seconds": summarize(fanout),
+        "platform_seconds": {name: summarize(samples) for name, samples in per_platform.items()},
+        "failures": failures,
+        "social_latency": args.social_latency,
+        "container_delay": args.container_delay,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--pages", type=int, default=200, help="pages in the synthetic site (and crawl limit)")
+    parser.add_argument("--page-kb", type=int, default=20)
+    parser.add_argument("--fanout", type=int, default=8, help="links per synthetic page")
+    parser.add_argument("--site-latency", type=float, default=0.0)
+    parser.add_argument("--openai-latency", type=float, default=0.2)
+    parser.add_argument("--social-latency", type=float, default=0.05)
+    parser.add_argument("--container-delay", type=float, default=0.5,
+                        help="seconds the fake Graph API keeps Instagram containers IN_PROGRESS")
+    parser.add_argument("--host-delay", type=float, default=0.0, help="crawler politeness delay (CRAWL_HOST_DELAY)")
+    parser.add_argument("--embedder", default="hashing", help="EMBEDDER for the index (hashing avoids embedding calls)")
+    parser.add_argument("--runs", type=int, default=10, help="repetitions for the generate and publish scenarios")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    cache_dir = tempfile.mkdtemp(prefix="content-agent-bench-")
+    configure_environment(args, cache_dir)
+    site_server = fake_site.serve(SITE_PORT, args.pages, args.page_kb, args.fanout, args.site_latency)
+    fake_openai.serve(OPENAI_PORT, args.openai_latency)
+    fake_social.serve(SOCIAL_PORT, args.social_latency, container_delay=args.container_delay)
+    site_url = f"http://127.0.0.1:{SITE_PORT}/"
+
+    results = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        if "crawl" in scenarios:
+            results["crawl"] = bench_crawl(args, site_url, cache_dir)
+        if "parse" in scenarios:
+            results["parse"] = bench_parse(args, site_server.site)
+        if "generate" in scenarios or "publish" in scenarios:
+            from agent import LangGraphAgent
+            agent = LangGraphAgent(site_url, load=False)
+            if "generate" in scenarios:
+                agent.load_corpus()
+                results["generate"] = bench_generate(args, agent)
+            if "publish" in scenarios:
+                results["publish"] = bench_publish(args, agent)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": vars(args),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,157 +1,519 @@
 # filepath: content-agent-langgraph/content-agent-langgraph/src/agent.py
 import os
-import openai
-from bs4 import BeautifulSoup
-import requests
-from dotenv import load_dotenv
-from utils.social_media import post_to_facebook, post_to_instagram, post_to_twitter, post_to_linkedin, schedule_to_platforms, convert_gst_to_utc
-from urllib.parse import urljoin, urlparse
+import argparse
+import json
 import time
+from dotenv import load_dotenv
+from utils.social_media import convert_gst_to_utc
+from utils.publisher import publish, post_to, ALL_PLATFORMS
+from utils.image_store import get_image_store
+from utils.outbox import Outbox, OutboxScheduler
+from utils.post_history import DuplicatePostError, PostHistory
+from utils.prompts import build_caption_prompt, estimate_tokens, format_context, parse_caption_output
+from utils import telemetry
+from utils.streaming import CaptionStreamParser, stream_completion
+from utils.pipeline import Pipeline
+from utils.llm_cache import ResponseCache, cache_key, CHAT_CACHE_TTL, IMAGE_CACHE_TTL
+from utils.variants import (build_fix_prompt, build_variants_prompt, fit_variant, parse_variants, pick_variants,
+                            supports_json_mode, variant_problem)
 from datetime import datetime, timedelta
 import pytz
 # Load environment variables
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4")
+CHAT_TEMPERATURE = 0.7
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+# Targeted re-requests for a platform variant that fails its length/hashtag checks
+VARIANT_MAX_FIXES = int(os.getenv("VARIANT_MAX_FIXES", "2"))
+# Regenerations of a draft that repeats a recent post before it is rejected
+POST_MAX_REGENERATIONS = int(os.getenv("POST_MAX_REGENERATIONS", "2"))
+# The OpenAI SDK, the crawler (lxml) and the index (faiss, numpy) are imported by the
+# stage that first needs them, so scheduler runs and --help start without loading them.
+
+
+def record_chat_usage(usage, prompt: str, output: str):
+    """Token and cost accounting for one completion; estimated from the text when the API sent no usage."""
+    if not telemetry.enabled():
+        return
+    if usage is not None:
+        telemetry.record_usage(CHAT_MODEL, usage.prompt_tokens, usage.completion_tokens,
+                               cached_tokens=telemetry.cached_prompt_tokens(usage))
+    else:
+        telemetry.record_usage(CHAT_MODEL, estimate_tokens(prompt), estimate_tokens(output), estimated=True)
 
 # Initialize the LangGraph agent
 class LangGraphAgent:
-    def __init__(self, url: str):
-        self.retrieved_docs = [
-    type("Doc", (object,), {"page_content": page["content"], "metadata": {"source": page["url"]}})
-    for page in LangGraphAgent.crawl_website(url)]
+    def __init__(self, url: str, load: bool = True):
+        self.url = url
+        self.retrieved_docs = []
+        self.index = None
+        self.digests = {}
+        self.llm_cache = ResponseCache()
+        self.outbox = Outbox()
+        self.history = PostHistory()
+        self.last_ttft = None
+        if load:
+            self.load_corpus()
+
+    def load_corpus(self):
+        """Crawl the site and sync the vector index. Slow, so callers may run it in the background."""
+        from utils.docstore import DocStore
+        from utils.retrieval import build_or_load_index
+        pages = LangGraphAgent.crawl_website(self.url)
+        docs = DocStore.from_pages(pages)
+        # Swapped in only once built, so a server refresh never exposes a half-built index
+        index = build_or_load_index(docs)
+        digests = {page["url"]: page["digest"] for page in pages}
+        self.retrieved_docs, self.index, self.digests = docs, index, digests
+        return docs
 
     # Helper: Retrieve web content and build retriever 
 
     def is_valid_url(url, domain):
-        return urlparse(url).netloc == urlparse(domain).netloc
+        from utils.crawler import is_valid_url
+        return is_valid_url(url, domain)
 
-    def crawl_website(start_url, max_pages=20):
-        visited = set()
-        to_visit = [start_url]
-        pages = []
+    def crawl_website(start_url, max_pages=20, dedup=True):
+        from utils.crawler import crawl_website
+        from utils.crawl_store import CrawlStore
+        # Pages cached from the previous run are revalidated with conditional GETs
+        return crawl_website(start_url, max_pages=max_pages, store=CrawlStore(), dedup=dedup)
 
-        while to_visit and len(visited) < max_pages:
-            url = to_visit.pop(0)
-            if url in visited:
-                continue
-            try:
-                response = requests.get(url, timeout=10)
-                visited.add(url)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    text = soup.get_text(separator=' ', strip=True)
-                    pages.append({"url": url, "content": text})
-
-                    for link in soup.find_all('a', href=True):
-                        full_url = urljoin(url, link['href'])
-                        if LangGraphAgent.is_valid_url(full_url, start_url) and full_url not in visited:
-                            to_visit.append(full_url)
-
-                    time.sleep(1)  # be respectful of rate limits
-            except Exception as e:
-                print(f"Error fetching {url}: {e}")
 
-        return pages
+    def build_context(self, topic):
+        return self.build_contexts([topic])[0]
 
+    def build_contexts(self, topics):
+        """Context block per topic: the digests of the pages its most relevant chunks come
+        from, in URL order so topics that retrieve the same pages send the same block. Every
+        topic is embedded in one call."""
+        from utils.digest import format_digests
+        from utils.retrieval import RETRIEVAL_TOP_K
+        contexts = []
+        for chunks in self.index.search_many(topics, RETRIEVAL_TOP_K):
+            sources = sorted({chunk.metadata["source"] for chunk in chunks})
+            if not all(source in self.digests for source in sources):
+                contexts.append(format_context(chunks))
+                continue
+            contexts.append(format_digests(self.digests[source] for source in sources))
+        return contexts
 
 # Generate caption using LangChain RAG pipeline
-    def generate_caption_and_content(self, topic, retrieved_docs):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+    def generate_caption_and_content(self, topic, retrieved_docs, force=False, stream=False, on_caption=None):
+        """Returns (caption, content) written from the given docs; see generate_post."""
+        from utils.retrieval import RETRIEVAL_TOP_K
+        return self._draft(topic, format_context(retrieved_docs[:RETRIEVAL_TOP_K]), force, stream, on_caption)
 
-        # Combine retrieved content
-        context = "\n\n".join([f"{i+1}. {doc.page_content}" for i, doc in enumerate(retrieved_docs[:5])])
+    def generate_post(self, topic, force=False, stream=False, on_caption=None):
+        """Returns (caption, content) written from the current index's context for the topic.
+        With stream=True tokens are printed as they arrive and on_caption(caption) is called
+        as soon as the caption section is complete.
 
-        # Prompt for generation
-        prompt = f"""
-    You are a B2B tech content strategist. Based on the topic and contextual content below, write:
+        A draft too similar to a recent post is regenerated with that post as a hint to take
+        another angle, up to POST_MAX_REGENERATIONS times; then DuplicatePostError is raised.
+        """
+        return self._draft(topic, self.build_context(topic), force, stream, on_caption)
 
-    1. A professional LinkedIn **caption** (max 250 characters) designed to spark interest.
-    2. A concise and informative **LinkedIn post body** (80–150 words) written in simple, authoritative tone.
+    def _draft(self, topic, context, force, stream, on_caption):
+        avoid = None
+        for attempt in range(POST_MAX_REGENERATIONS + 1):
+            # A regeneration must be a fresh completion: the cached one may be the repeat itself
+            caption, content = self._generate_caption(build_caption_prompt(topic, context, avoid), context,
+                                                      force or attempt > 0, stream, on_caption)
+            similar = self.history.find_similar(f"{caption}\n\n{content}")
+            if similar is None:
+                return caption, content
+            print(f"🔁 Draft is {similar}" + ("; regenerating it" if attempt < POST_MAX_REGENERATIONS else ""))
+            avoid = similar.text
+        raise DuplicatePostError(similar, POST_MAX_REGENERATIONS)
 
-    Topic: {topic}
+    def _generate_caption(self, prompt, context, force, stream, on_caption):
+        import openai
+        openai.api_key = os.getenv("OPENAI_API_KEY")
 
-    Context from website content:
-    {context}
+        # Same prompt and context give the same post, so reuse it unless asked to regenerate
+        key = cache_key("chat", CHAT_MODEL, CHAT_TEMPERATURE, prompt, context)
+        output = None if force else self.llm_cache.get(key)
+        if output is not None:
+            print(f"♻️ Using cached generation ({self.llm_cache.stats()})")
+            caption, content = parse_caption_output(output)
+            if on_caption:
+                on_caption(caption)
+            return caption, content
 
-    Format:
-    CAPTION: <caption here>
-    CONTENT: <content here>
-    """
+        if stream:
+            parser = CaptionStreamParser(on_caption)
+            usage = []
+            with telemetry.span("chat", model=CHAT_MODEL, stream=True) as s:
+                started = time.perf_counter()
+                response = openai.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=CHAT_TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True}
+                )
+                self.last_ttft = stream_completion(response, parser, started, on_usage=usage.append)
+                s.set(ttft_ms=round(self.last_ttft * 1000, 1) if self.last_ttft is not None else None)
+                output = parser.buffer
+                record_chat_usage(usage[-1] if usage else None, prompt, output)
+            if self.last_ttft is not None:
+                print(f"⏱️ Time to first token: {self.last_ttft * 1000:.0f} ms")
+            self.llm_cache.set(key, output, CHAT_CACHE_TTL)
+            return parser.result()
 
-        response = openai.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-        )
-        output = response.choices[0].message.content
+        with telemetry.span("chat", model=CHAT_MODEL, stream=False):
+            response = openai.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=CHAT_TEMPERATURE
+            )
+            output = response.choices[0].message.content
+            record_chat_usage(response.usage, prompt, output)
+        self.llm_cache.set(key, output, CHAT_CACHE_TTL)
 
         # Extract caption and content robustly
-        caption = ""
-        content = ""
-        if "CAPTION:" in output and "CONTENT:" in output:
-            caption = output.split("CAPTION:")[1].split("CONTENT:")[0].strip()
-            content = output.split("CONTENT:")[1].strip()
-        else:
-            caption = "⚠️ Could not parse caption"
-            content = output.strip()
-
+        caption, content = parse_caption_output(output)
+        if on_caption:
+            on_caption(caption)
         return caption, content
 
-    def generate_image(self, prompt: str) -> str:
-        try:
-            response = openai.images.generate(
-                model="dall-e-3", 
-                prompt=prompt,
-                n=1,
-                size="1024x1024"
+    def _complete_json(self, prompt: str, n: int = 1) -> list:
+        """One chat call asking for a JSON object; returns the text of each of the n choices."""
+        import openai
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        extra = {"response_format": {"type": "json_object"}} if supports_json_mode(CHAT_MODEL) else {}
+        with telemetry.span("chat", model=CHAT_MODEL, variants=True, n=n):
+            response = openai.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=CHAT_TEMPERATURE,
+            n=n,
+            **extra
             )
-            image_url = response.data[0].url
+            outputs = [choice.message.content or "" for choice in response.choices]
+            record_chat_usage(response.usage, prompt, "".join(outputs))
+        return outputs
+
+    def generate_variants(self, topic, platforms, n=1, force=False):
+        """Post text for every platform from one structured completion. Returns {platform: text}.
+
+        With n > 1 the call returns n candidates and each platform takes the first variant
+        that passes its local checks. Only platforms left without a valid variant are
+        re-requested, one small call each, before falling back to trimming.
+        """
+        context = self.build_context(topic)
+        prompt = build_variants_prompt(topic, context, platforms)
+        key = cache_key("variants", CHAT_MODEL, CHAT_TEMPERATURE, prompt, context, n=n)
+        cached = None if force else self.llm_cache.get(key)
+        if cached is not None:
+            print(f"♻️ Using cached variants ({self.llm_cache.stats()})")
+            return json.loads(cached)
+
+        candidates = []
+        for output in self._complete_json(prompt, n):
+            try:
+                candidates.append(parse_variants(output))
+            except ValueError as e:
+                print(f"⚠️ Discarding unparseable candidate: {e}")
+        variants, problems = pick_variants(candidates, platforms)
+
+        for platform, (text, problem) in problems.items():
+            for _ in range(VARIANT_MAX_FIXES):
+                print(f"🔁 Re-requesting the {platform} variant: {problem}")
+                try:
+                    text = parse_variants(self._complete_json(build_fix_prompt(platform, text, problem))[0]).get(platform) or text
+                except ValueError:
+                    pass
+                problem = variant_problem(platform, text)
+                if problem is None:
+                    break
+            if problem is not None:
+                print(f"⚠️ {platform} variant still invalid ({problem}), trimming it")
+            variants[platform] = fit_variant(platform, text)
+
+        variants = {platform: variants[platform] for platform in platforms}
+        self.llm_cache.set(key, json.dumps(variants), CHAT_CACHE_TTL)
+        return variants
+
+    def generate_batch(self, topics, out_path, **kwargs):
+        """Generate caption and content for many topics concurrently, streaming JSONL to out_path."""
+        from utils.batch import generate_batch
+        return generate_batch(self.build_contexts, topics, out_path, CHAT_MODEL, **kwargs)
+
+    def run_change_feed(self, out_path, platforms=None, concurrency=None):
+        """Crawl, diff against the previous crawl and generate a post for each new or changed
+        page, with that page's changed text as the only context. With `platforms` the posts
+        are published too. Changes not handled this run stay queued for the next one."""
+        from utils.batch import generate_batch, BATCH_CONCURRENCY
+        from utils.change_feed import ChangeFeed, CHANGE_FEED_MAX_PAGES
+        feed = ChangeFeed()
+        feed.record(LangGraphAgent.crawl_website(self.url, max_pages=CHANGE_FEED_MAX_PAGES, dedup=False))
+        changes = feed.pending()
+        if not changes:
+            print("📰 Nothing new to post about")
+            return []
+        # Titles are the prompt topics; two changes may share one, so results pair up by position
+        records = generate_batch(lambda titles: [format_context([change]) for change in changes],
+                                 [change.title for change in changes], out_path, CHAT_MODEL,
+                                 concurrency=concurrency or BATCH_CONCURRENCY)
+        for change, record in zip(changes, records):
+            record["url"] = change.url
+            if record["status"] != "success":
+                feed.fail(change.id, record.get("error"))
+                continue
+            similar = self.history.find_similar(f"{record['caption']}\n\n{record['content']}")
+            if similar is not None:
+                print(f"⏭️ Not posting about {change.url}: the draft is {similar}")
+                record["status"] = "duplicate"
+            elif platforms:
+                # Instagram needs an image; LinkedIn gets one as the interactive flow does
+                image_url = (self.generate_image(change.topic)
+                             if "instagram" in platforms or "linkedin" in platforms else None)
+                results = self.post_to_platforms(record["caption"], record["content"], image_url, platforms,
+                                                 topic=change.topic)
+                record["posts"] = {result.platform: result.post_id for result in results}
+            feed.complete(change.id, json.dumps(record, ensure_ascii=False))
+        print(f"📰 Change feed queue: {feed.counts()}")
+        return records
+
+    def generate_image(self, prompt: str, force=False) -> str:
+        import openai
+        key = cache_key("image", IMAGE_MODEL, prompt=prompt, size=IMAGE_SIZE)
+        image_url = None if force else self.llm_cache.get(key)
+        if image_url:
+            print(f"♻️ Using cached image: {image_url}")
+            return image_url
+        try:
+            with telemetry.span("image", model=IMAGE_MODEL, size=IMAGE_SIZE):
+                response = openai.images.generate(
+                    model=IMAGE_MODEL,
+                    prompt=prompt,
+                    n=1,
+                    size=IMAGE_SIZE
+                )
+                image_url = response.data[0].url
+                telemetry.record_image(IMAGE_MODEL, IMAGE_SIZE)
+            self.llm_cache.set(key, image_url, IMAGE_CACHE_TTL)
             print(f"✅ AI image generated: {image_url}")
+            # Stored now, while the URL is live: a post scheduled days out outlives it
+            try:
+                get_image_store().fetch(image_url)
+            except Exception as e:
+                print(f"⚠️ Could not store the image locally: {e}")
             return image_url
         except Exception as e:
             print(f"❌ Failed to generate image: {e}")
             return None
 
-    def post_to_platforms(self, caption: str, content: str, image_url: str, platforms: list):
-        post_body = f"{caption}\n\n{content}"
-        if "facebook" in platforms:
-            post_to_facebook(post_body, image_url)
-        if "instagram" in platforms:
-            if image_url:
-                post_to_instagram(post_body, image_url)
-        if "twitter" in platforms:
-            post_to_twitter(post_body)
-        if "linkedin" in platforms:
-            post_to_linkedin(post_body, image_url)
+    def post_to_platforms(self, caption: str, content: str, image_url: str, platforms: list, variants: dict = None,
+                          topic: str = None, extra_image_urls: list = None):
+        """Publish to all selected platforms in parallel. Returns a PostResult per platform.
+
+        A platform with an entry in `variants` gets that text; the rest get caption and content.
+        `extra_image_urls` turn the Instagram post into a carousel after `image_url`.
+        Each platform's post is recorded in the outbox first, so running the same post again
+        after a partial failure only retries the platforms that failed transiently (a refused
+        connection, 429 or 503); any other failure is final.
+        Published posts are added to the post history.
+        """
+        post_body = f"{caption}\n\n{content}" if content else caption
+        if "instagram" in platforms and not image_url:
+            print("Instagram post requires an image. Skipping.")
+            platforms = [platform for platform in platforms if platform != "instagram"]
+        bodies = {platform: (variants or {}).get(platform) or post_body for platform in platforms}
+        jobs = {}
+        for platform in platforms:
+            extras = extra_image_urls if platform == "instagram" else None
+            job_id, _ = self.outbox.enqueue(platform, bodies[platform], image_url, extra_image_urls=extras)
+            if self.outbox.claim(job_id):
+                jobs[platform] = job_id
+            elif self.outbox.status(job_id) == "running":
+                print(f"⏳ {platform} post is being published by another run, skipping")
+            elif self.outbox.status(job_id) == "failed":
+                print(f"⚠️ {platform} post already failed permanently, skipping")
+            else:
+                print(f"♻️ Already posted to {platform}, skipping")
+        results = publish(post_body, image_url, list(jobs), bodies=bodies, extra_image_urls=extra_image_urls)
+        for result in results:
+            job_id = jobs.pop(result.platform)
+            if result.status == "success":
+                self.outbox.complete(job_id, result.post_id)
+                self.history.record(result.platform, bodies[result.platform], topic)
+            elif result.transient:
+                # Left pending so the next run of the same post (or the scheduler) retries it
+                self.outbox.fail(job_id, result.error, retry_at=time.time())
+            else:
+                # Retrying could post twice or repeat a rejected request
+                self.outbox.fail(job_id, result.error)
+        return results
+
+    def schedule_post(self, caption: str, image_url: str, platforms: list, scheduled_time_utc: datetime,
+                      variants: dict = None, topic: str = None, extra_image_urls: list = None):
+        """Queue the post in the outbox for every platform; `--run-scheduler` publishes it.
+        It goes into the post history now, so later drafts do not repeat it before it is out."""
+        run_at = scheduled_time_utc.timestamp()
+        if "instagram" in platforms and not image_url:
+            print("Instagram post requires an image. Skipping.")
+            platforms = [platform for platform in platforms if platform != "instagram"]
+        for platform in platforms:
+            body = (variants or {}).get(platform) or caption
+            extras = extra_image_urls if platform == "instagram" else None
+            job_id, created = self.outbox.enqueue(platform, body, image_url, run_at=run_at, extra_image_urls=extras)
+            if created:
+                self.history.record(platform, body, topic, posted_at=run_at)
+            state = "scheduled" if created else "already scheduled"
+            print(f"🗓️ {platform} post {state} for {scheduled_time_utc:%Y-%m-%d %H:%M} UTC (job {job_id})")
+
+
+def parse_platforms(value: str) -> list:
+    """'facebook, linkedin' or 'all' → list of platform names."""
+    platforms = [p.strip() for p in value.lower().split(",") if p.strip()]
+    if "all" in platforms:
+        return list(ALL_PLATFORMS)
+    unknown = [p for p in platforms if p not in ALL_PLATFORMS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown platform(s): {', '.join(unknown)}")
+    return platforms
+
+
+def parse_schedule(value: str) -> datetime:
+    """'YYYY-MM-DD HH:MM' in GST → UTC datetime at least 20 minutes from now."""
+    try:
+        scheduled_time_utc = convert_gst_to_utc(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected 'YYYY-MM-DD HH:MM' (GST)")
+    if scheduled_time_utc <= datetime.now(pytz.utc) + timedelta(minutes=20):
+        raise argparse.ArgumentTypeError("Time must be at least 20 minutes in the future (in UTC).")
+    return scheduled_time_utc
 
 
 # Main script
 if __name__ == "__main__":
-    agent = LangGraphAgent("https://cloudjune.com")
-    topic = input("What do you want to post about today? ")
-    caption, content = agent.generate_caption_and_content(topic, agent.retrieved_docs)
-    print("\nGenerated caption:\n", caption)
-    print("\nGenerated content:\n", content)
-    image_url = agent.generate_image(topic)
+    parser = argparse.ArgumentParser(description="Generate and publish social media posts from cloudjune.com content.")
+    parser.add_argument("--topic", help="what to post about (prompted for when omitted)")
+    parser.add_argument("--platforms", type=parse_platforms,
+                        help="comma-separated platforms or 'all' (prompted for when omitted)")
+    parser.add_argument("--schedule", metavar="'YYYY-MM-DD HH:MM'", type=parse_schedule,
+                        help="queue the post for this GST time instead of posting now")
+    parser.add_argument("--batch", metavar="TOPICS_FILE", help="generate posts for every topic in the file (one per line) and exit")
+    parser.add_argument("--out", default="batch_results.jsonl", help="JSONL output for --batch and --from-changes")
+    parser.add_argument("--concurrency", type=int, help="concurrent generations for --batch (default: BATCH_CONCURRENCY)")
+    parser.add_argument("--regenerate", action="store_true", help="ignore cached generations and call the API again")
+    parser.add_argument("--no-stream", action="store_true", help="wait for the full completion instead of streaming it")
+    parser.add_argument("--variants", action="store_true",
+                        help="write separate copy for each platform (tweet-length for Twitter, hashtags for Instagram) in one call")
+    parser.add_argument("--candidates", type=int, default=1, help="candidates requested per --variants call (the API's n)")
+    parser.add_argument("--extra-image", metavar="URL", action="append",
+                        help="another image for an Instagram carousel after the generated one (repeatable)")
+    parser.add_argument("--run-scheduler", action="store_true", help="publish scheduled posts from the outbox as they fall due")
+    parser.add_argument("--from-changes", action="store_true",
+                        help="generate (and with --platforms, publish) posts about pages that are new or changed since the last run")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP API with the corpus, clients and scheduler kept warm")
+    parser.add_argument("--port", type=int, help="port for --serve (default: SERVER_PORT or 8080)")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="log per-stage spans as JSON and write Prometheus metrics (also CONTENT_AGENT_TELEMETRY=1)")
+    parser.add_argument("--profile-startup", action="store_true", help="print an import-time breakdown by stage and exit")
+    args = parser.parse_args()
+    if args.telemetry:
+        telemetry.enable()
+
+    if args.profile_startup:
+        from utils.startup import print_startup_profile
+        print_startup_profile()
+        raise SystemExit(0)
+
+    if args.run_scheduler:
+        scheduler = OutboxScheduler(Outbox(), post_to)
+        print(f"🗓️ Outbox scheduler running ({scheduler.outbox.counts()})")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        raise SystemExit(0)
+
+    agent = LangGraphAgent("https://cloudjune.com", load=False)
+    if args.serve:
+        from utils.server import serve, SERVER_PORT
+        serve(agent, port=args.port or SERVER_PORT)
+        raise SystemExit(0)
+    if args.from_changes:
+        agent.run_change_feed(args.out, platforms=args.platforms, concurrency=args.concurrency)
+        raise SystemExit(0)
+    if args.batch:
+        from utils.batch import read_topics, BATCH_CONCURRENCY
+        agent.load_corpus()
+        agent.generate_batch(read_topics(args.batch), args.out, concurrency=args.concurrency or BATCH_CONCURRENCY)
+        raise SystemExit(0)
+
+    # Crawl and index load run while the topic is typed; caption and image only need the
+    # topic (the image prompt is the topic), so they run side by side.
+    pipeline = Pipeline()
+    pipeline.add("corpus", agent.load_corpus)
+    if args.topic:
+        topic = pipeline.run_inline("topic", lambda: args.topic)
+    else:
+        topic = pipeline.run_inline("topic", input, "What do you want to post about today? ")
+    if args.variants:
+        pipeline.add("caption", lambda docs, topic: agent.generate_variants(
+            topic, args.platforms or ALL_PLATFORMS, n=args.candidates, force=args.regenerate), deps=("corpus", "topic"))
+    else:
+        pipeline.add("caption", lambda docs, topic: agent.generate_post(
+            topic, force=args.regenerate, stream=not args.no_stream), deps=("corpus", "topic"))
+    # A topic posted about recently may get a draft that is rejected as a repeat, so its
+    # image waits for an accepted caption; otherwise the two run side by side
+    image_deps = ("topic", "caption") if agent.history.posted_about(topic) else ("topic",)
+    pipeline.add("image", lambda topic, *_: agent.generate_image(topic, force=args.regenerate), deps=image_deps)
+    variants = None
+    if args.variants:
+        variants = pipeline.result("caption")
+        # Platforms outside the generated set fall back to the LinkedIn copy
+        caption, content = variants.get("linkedin") or next(iter(variants.values()), ""), ""
+    else:
+        try:
+            caption, content = pipeline.result("caption")
+        except DuplicatePostError as e:
+            print(f"❌ Not posting: the {e}. Try a different topic.")
+            pipeline.shutdown()
+            raise SystemExit(1)
+    image_url = pipeline.result("image")
+    pipeline.report()
+    pipeline.shutdown()
+    if variants:
+        for platform, text in variants.items():
+            print(f"\nGenerated {platform} post ({len(text)} chars):\n", text)
+    else:
+        print("\nGenerated caption:\n", caption)
+    if args.no_stream and not variants:
+        print("\nGenerated content:\n", content)
     if not image_url:
         print("Image generation failed, proceeding without image.")
-    platforms = input("Which platforms to post to? (facebook, instagram, twitter, linkedin, all): ").lower().split(", ")
-    if "all" in platforms:
-        platforms = ["facebook", "instagram", "twitter", "linkedin"]
-    scheduling = input("Do you want to schedule the post? (y/n): ").lower()
 
-if scheduling == 'y':
-    user_input = input("Enter post time in GST (YYYY-MM-DD HH:MM): ")
-    try:
-        scheduled_time_utc = convert_gst_to_utc(user_input)
-        now_utc = datetime.now(pytz.utc)
-        if scheduled_time_utc <= now_utc + timedelta(minutes=20):
-            raise ValueError("Time must be at least 20 minutes in the future (in UTC).")
-        schedule_to_platforms(caption, image_url, platforms, scheduled_time_utc)
-    except ValueError as e:
-        print("❌ Error:", e)
-elif scheduling == 'n':
-    agent.post_to_platforms(caption, content, image_url, platforms)
-    print("✅ Post published immediately!")
-else:
-    print("❌ Invalid input. Please enter 'y' or 'n'.")
\ No newline at end of file
+    # With --platforms the run is non-interactive: it posts now, or at --schedule
+    platforms = args.platforms
+    scheduling = 'y' if args.schedule else 'n'
+    if platforms is None:
+        try:
+            platforms = parse_platforms(input("Which platforms to post to? (facebook, instagram, twitter, linkedin, all): "))
+        except argparse.ArgumentTypeError as e:
+            print("❌ Error:", e)
+            raise SystemExit(1)
+        if not args.schedule:
+            scheduling = input("Do you want to schedule the post? (y/n): ").lower()
+
+    if scheduling == 'y':
+        try:
+            scheduled_time_utc = args.schedule or parse_schedule(input("Enter post time in GST (YYYY-MM-DD HH:MM): "))
+            agent.schedule_post(caption, image_url, platforms, scheduled_time_utc, variants=variants, topic=topic,
+                                extra_image_urls=args.extra_image)
+            print("Run `python agent.py --run-scheduler` to publish scheduled posts when they fall due.")
+        except argparse.ArgumentTypeError as e:
+            print("❌ Error:", e)
+    elif scheduling == 'n':
+        agent.post_to_platforms(caption, content, image_url, platforms, variants=variants, topic=topic,
+                                extra_image_urls=args.extra_image)
+        print("✅ Post published immediately!")
+    else:
+        print("❌ Invalid input. Please enter 'y' or 'n'.")
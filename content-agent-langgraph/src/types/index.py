@@ -20,10 +20,14 @@ class SocialMediaCredentials:
         self.user_id = user_id
 
 class PostResult:
-    def __init__(self, post_id: str, platform: str, status: str):
+    def __init__(self, post_id: str, platform: str, status: str, latency: float = 0.0, error: Optional[str] = None,
+                 transient: bool = False):
         self.post_id = post_id
         self.platform = platform
         self.status = status
+        self.latency = latency
+        self.error = error
+        self.transient = transient
 
 class ImageGenerationResult:
     def __init__(self, image_url: str, prompt: str):
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+import openai
+
+from utils.prompts import build_caption_prompt, estimate_tokens, parse_caption_output
+from utils.rate_limit import RateLimiter
+from utils.telemetry import cached_prompt_tokens, record_usage, span
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "30000"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "6"))
+# Completion budget reserved per call on top of the prompt estimate
+COMPLETION_TOKENS = 400
+
+
+def read_topics(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _retry_delay(error, attempt: int) -> float:
+    """Honor Retry-After when the server sends it, else exponential backoff with full jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(60.0, 2 ** attempt))
+
+
+class BatchGenerator:
+    """Generates captions for many topics concurrently on the async OpenAI client, sharing one
+    RPM/TPM budget and streaming each result to JSONL as soon as it completes.
+
+    `contexts_for(topics)` returns the context block for each topic. It may block (retrieval
+    embeds the topics), so it runs once for the whole batch, on a worker thread.
+    """
+
+    def __init__(self, contexts_for, model: str, client=None, concurrency: int = BATCH_CONCURRENCY,
+                 limiter: RateLimiter = None, max_retries: int = BATCH_MAX_RETRIES, temperature: float = 0.7):
+        self.contexts_for = contexts_for
+        self.model = model
+        # Retries are handled here so they go through the shared rate limiter
+        self.client = client or openai.AsyncOpenAI(max_retries=0)
+        self.concurrency = concurrency
+        self.limiter = limiter or RateLimiter(OPENAI_RPM, OPENAI_TPM)
+        self.max_retries = max_retries
+        self.temperature = temperature
+
+    async def _complete(self, prompt: str):
+        reserved = estimate_tokens(prompt) + COMPLETION_TOKENS
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async(reserved)
+            try:
+                with span("chat", model=self.model, batch=True, attempt=attempt):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=self.temperature,
+                    )
+                    if response.usage:
+                        record_usage(self.model, response.usage.prompt_tokens, response.usage.completion_tokens,
+                                     cached_tokens=cached_prompt_tokens(response.usage))
+                return response
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _retry_delay(e, attempt)
+                print(f"⏳ {type(e).__name__}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _generate_one(self, topic: str, context: str, semaphore, out, lock):
+        async with semaphore:
+            started = time.perf_counter()
+            record = {"topic": topic}
+            try:
+                response = await self._complete(build_caption_prompt(topic, context))
+                record["caption"], record["content"] = parse_caption_output(response.choices[0].message.content)
+                record["status"] = "success"
+            except Exception as e:
+                record["status"] = "failed"
+                record["error"] = str(e)
+            record["latency"] = round(time.perf_counter() - started, 3)
+        async with lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+        return record
+
+    async def run(self, topics: list, out_path: str):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        lock = asyncio.Lock()
+        started = time.perf_counter()
+        # Counted as one request against the shared budget: with the OpenAI embedder it is one
+        await self.limiter.acquire_async(sum(estimate_tokens(topic) for topic in topics))
+        contexts = await asyncio.to_thread(self.contexts_for, topics)
+        with open(out_path, "w", encoding="utf-8") as out:
+            results = await asyncio.gather(*(self._generate_one(topic, context, semaphore, out, lock)
+                                             for topic, context in zip(topics, contexts)))
+        elapsed = time.perf_counter() - started
+        ok = sum(1 for r in results if r["status"] == "success")
+        print(f"✅ Batch: {ok}/{len(topics)} topics generated in {elapsed:.1f}s → {out_path}")
+        return results
+
+
+def generate_batch(contexts_for, topics: list, out_path: str, model: str, **kwargs):
+    """Synchronous entry point: run a BatchGenerator over `topics` and write JSONL to `out_path`.
+    Returns the records in `topics` order."""
+    return asyncio.run(BatchGenerator(contexts_for, model, **kwargs).run(topics, out_path))
@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+import time
+import zlib
+
+from utils.crawl_store import content_hash
+from utils.dedup import block_key, site_wide_blocks, split_blocks
+from utils.paths import CACHE_DIR, open_sqlite
+
+CHANGE_FEED_PATH = os.getenv("CHANGE_FEED_PATH", os.path.join(CACHE_DIR, "changes.db"))
+# Pages crawled per change-feed run; the sitemap puts recently modified pages first
+CHANGE_FEED_MAX_PAGES = int(os.getenv("CHANGE_FEED_MAX_PAGES", "100"))
+# Posts generated per run; the rest stay queued for the next run
+CHANGE_FEED_MAX_POSTS = int(os.getenv("CHANGE_FEED_MAX_POSTS", "5"))
+# Changed text handed to the prompt as context
+CHANGE_CONTEXT_CHARS = int(os.getenv("CHANGE_CONTEXT_CHARS", "4000"))
+CHANGE_MAX_ATTEMPTS = int(os.getenv("CHANGE_MAX_ATTEMPTS", "3"))
+# Extracted <h1>-<h3> text: a few words, no closing punctuation
+HEADING_MAX_WORDS = 12
+# Link and button labels look like headings but say nothing about the page
+LINK_LABELS = frozenset({
+    "read more", "learn more", "find out more", "see more", "view more", "more", "click here", "contact us",
+    "get in touch", "get started", "book a demo", "home", "menu", "skip to content", "back to top",
+})
+
+
+def changed_text(old: str, new: str, ignore: set = frozenset()) -> str:
+    """Blocks of `new` that `old` does not contain, in page order. Extracted text has one
+    block per line, so this is what was added or rewritten, without the untouched rest.
+    Blocks whose key is in `ignore` (site chrome) never count as changed."""
+    old_blocks = set(split_blocks(old))
+    return "\n".join(block for block in split_blocks(new)
+                     if block not in old_blocks and block_key(block) not in ignore)
+
+
+def is_heading(block: str) -> bool:
+    words = block.split()
+    return (0 < len(words) <= HEADING_MAX_WORDS and (block[0].isupper() or block[0].isdigit())
+            and block[-1] not in ".!?,;:…" and re.sub(r"[^\w\s]", "", block).strip().lower() not in LINK_LABELS)
+
+
+def change_title(text: str, page: str, ignore: set = frozenset()) -> str:
+    """What a change is about: its first heading-like block (a new section), else the page's
+    own first heading outside the site chrome, else the first changed line."""
+    for block in split_blocks(text) + [block for block in split_blocks(page) if block_key(block) not in ignore]:
+        if is_heading(block):
+            return block[:120]
+    return text.split("\n", 1)[0][:120]
+
+
+class Change:
+    """A new or changed page, shaped like a retrieved doc so it can be the prompt context."""
+    __slots__ = ("id", "url", "kind", "title", "text", "detected_at", "attempts")
+
+    def __init__(self, id, url, kind, title, text, detected_at, attempts=0):
+        self.id = id
+        self.url = url
+        self.kind = kind
+        self.title = title
+        self.text = text
+        self.detected_at = detected_at
+        self.attempts = attempts
+
+    @property
+    def topic(self) -> str:
+        return self.title
+
+    @property
+    def page_content(self) -> str:
+        return self.text[:CHANGE_CONTEXT_CHARS]
+
+    @property
+    def metadata(self) -> dict:
+        return {"source": self.url, "change": self.kind}
+
+
+class ChangeFeed:
+    """Content-hash snapshot of the site plus a queue of the pages that changed since.
+
+    `record(pages)` diffs a crawl against the snapshot; new and changed pages are queued with
+    just their changed text, so generation sees what is new rather than the whole page and
+    an unchanged site costs nothing beyond the crawl.
+    """
+
+    def __init__(self, path: str = CHANGE_FEED_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                content BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                title TEXT NOT NULL,
+                text TEXT NOT NULL,
+                detected_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS changes_status ON changes (status, detected_at)")
+        self._conn.commit()
+
+    def record(self, pages) -> list:
+        """Diff crawled pages against the snapshot and queue the new and changed ones.
+
+        Pages should be crawled without boilerplate removal: which blocks it strips depends
+        on the set of pages crawled, so stripped text would differ between unchanged crawls.
+        Blocks found on most pages of this crawl are left out of the changed text instead,
+        so an edit to the nav bar or footer does not queue every page.
+
+        The first crawl only seeds the snapshot; otherwise the whole site would count as new.
+        Pages missing from a crawl are left alone, since a crawl may stop at its page limit.
+        """
+        now = time.time()
+        changes = []
+        site_wide = site_wide_blocks([split_blocks(page["content"]) for page in pages])
+        with self._lock:
+            (seeded,) = self._conn.execute("SELECT COUNT(*) FROM snapshot").fetchone()
+            for page in pages:
+                digest = content_hash(page["content"])
+                row = self._conn.execute("SELECT content_hash, content FROM snapshot WHERE url = ?",
+                                         (page["url"],)).fetchone()
+                if row and row[0] == digest:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO snapshot (url, content_hash, content, updated_at) VALUES (?, ?, ?, ?)",
+                    (page["url"], digest, zlib.compress(page["content"].encode("utf-8")), now))
+                kind = "changed" if row else "new"
+                previous = zlib.decompress(row[1]).decode("utf-8") if row else ""
+                text = changed_text(previous, page["content"], site_wide)
+                if not seeded or not text:
+                    continue
+                title = change_title(text, page["content"], site_wide)
+                # A newer change to the same page replaces one that has not been posted yet
+                self._conn.execute("UPDATE changes SET status = 'superseded' WHERE url = ? AND status = 'pending'",
+                                   (page["url"],))
+                cursor = self._conn.execute(
+                    "INSERT INTO changes (url, kind, title, text, detected_at) VALUES (?, ?, ?, ?, ?)",
+                    (page["url"], kind, title, text, now))
+                changes.append(Change(cursor.lastrowid, page["url"], kind, title, text, now))
+            self._conn.commit()
+        if not seeded:
+            print(f"📰 Change feed baseline recorded ({len(pages)} pages); later runs post what changes")
+        else:
+            print(f"📰 Change feed: {len(changes)} new or changed page(s) out of {len(pages)} crawled")
+        return changes
+
+    def pending(self, limit: int = CHANGE_FEED_MAX_POSTS) -> list:
+        """Queued changes, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, url, kind, title, text, detected_at, attempts FROM changes WHERE status = 'pending' "
+                "ORDER BY detected_at, id LIMIT ?", (limit,)).fetchall()
+        return [Change(*row) for row in rows]
+
+    def complete(self, change_id: int, result: str = None):
+        with self._lock:
+            self._conn.execute("UPDATE changes SET status = 'done', result = ? WHERE id = ?", (result, change_id))
+            self._conn.commit()
+
+    def fail(self, change_id: int, error: str, max_attempts: int = CHANGE_MAX_ATTEMPTS):
+        """Count a failed attempt; the change stays queued until it has failed max_attempts times."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE changes SET attempts = attempts + 1, result = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END WHERE id = ?",
+                (error, max_attempts, change_id))
+            self._conn.commit()
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM changes GROUP BY status").fetchall())
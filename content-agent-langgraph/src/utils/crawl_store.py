@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+from utils.digest import summarize
+from utils.paths import CACHE_DIR, open_sqlite
+
+CRAWL_DB_PATH = os.getenv("CRAWL_DB_PATH", os.path.join(CACHE_DIR, "crawl.db"))
+# Bump when the extracted text or link format changes so stale pages are re-fetched in full
+SCHEMA_VERSION = 4
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class CrawlStore:
+    """On-disk page cache: extracted text and links (zlib-compressed) plus the validators
+    needed to re-fetch a page with a conditional GET, and page digests by content hash."""
+
+    def __init__(self, path: str = CRAWL_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS pages")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                content BLOB NOT NULL,
+                links BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS digests (content_hash TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get(self, url: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, content, links, fetched_at FROM pages WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, content, links, fetched_at = row
+        return {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": digest,
+            "content": _unpack(content),
+            "links": _unpack(links),
+            "fetched_at": fetched_at,
+        }
+
+    def conditional_headers(self, url: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def put(self, url: str, content: str, links: list, etag: str = None, last_modified: str = None) -> bool:
+        """Store a freshly fetched page. Returns True if its text differs from the cached copy."""
+        digest = content_hash(content)
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, content, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, digest, _pack(content), _pack(links), time.time()))
+            self._conn.commit()
+        return row is None or row[0] != digest
+
+    def digest(self, content: str) -> str:
+        """Digest of a page's text, summarized only the first time this exact text is seen."""
+        digest_key = content_hash(content)
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM digests WHERE content_hash = ?", (digest_key,)).fetchone()
+        if row:
+            return row[0]
+        digest = summarize(content)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO digests (content_hash, digest) VALUES (?, ?)", (digest_key, digest))
+            self._conn.commit()
+        return digest
+
+    def touch(self, url: str):
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT url FROM pages")]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,318 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urldefrag, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.crawl_store import CrawlStore
+from utils.dedup import dedup_pages
+from utils.digest import summarize
+from utils.extract import get_extractor
+from utils.sitemap import SiteRules, fetch_sitemap_urls
+from utils.telemetry import span
+from utils.urls import canonicalize, host_of
+
+# Crawler tuning, overridable from the environment
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+CRAWL_HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0.2"))
+CRAWL_HOST_MAX_IN_FLIGHT = int(os.getenv("CRAWL_HOST_MAX_IN_FLIGHT", "4"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "10"))
+# Processes used for HTML parsing; 0 parses on the fetching thread
+CRAWL_PARSE_WORKERS = int(os.getenv("CRAWL_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "content-agent")
+# Seed the frontier from robots.txt sitemaps (or /sitemap.xml) and honour robots.txt rules
+CRAWL_USE_SITEMAP = os.getenv("CRAWL_USE_SITEMAP", "1").lower() in ("1", "true", "yes")
+
+# Frontier tiers: the start page, then sitemap entries (newest lastmod first), then discovered links
+START_TIER, SITEMAP_TIER, LINK_TIER = 0, 1, 2
+
+
+def is_valid_url(url, domain):
+    return urlparse(url).netloc == urlparse(domain).netloc
+
+
+class HostBudget:
+    """Per-host politeness: a minimum spacing between request starts and a cap on requests in flight."""
+
+    def __init__(self, delay: float = CRAWL_HOST_DELAY, max_in_flight: int = CRAWL_HOST_MAX_IN_FLIGHT):
+        self.delay = delay
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._slots = {}
+        self._delays = {}
+
+    def set_delay(self, host: str, delay: float):
+        """Per-host spacing, e.g. a robots.txt Crawl-delay; never below the default."""
+        with self._lock:
+            self._delays[host] = max(self.delay, delay)
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.max_in_flight)
+            return self._slots[host]
+
+    def acquire(self, host: str):
+        self._semaphore(host).acquire()
+        # Reserve the next start time for this host, then wait for it outside the lock
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._delays.get(host, self.delay)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def release(self, host: str):
+        self._semaphore(host).release()
+
+
+def _declared_charset(response):
+    """Charset named in the Content-Type header, or None (requests would guess ISO-8859-1)."""
+    for param in response.headers.get("Content-Type", "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip("\"' ")
+    return None
+
+
+class Frontier:
+    """Priority crawl frontier over canonical URLs that remembers every URL it has ever queued.
+
+    Lower priorities pop first and equal priorities pop in insertion order, so pushing every
+    link with the same priority gives a plain breadth-first crawl.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seen = set()
+        self._order = itertools.count()
+        self.lastmod = {}
+
+    def push(self, url: str, priority=(LINK_TIER,), lastmod: float = None) -> bool:
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        if lastmod is not None:
+            self.lastmod[url] = lastmod
+        heapq.heappush(self._heap, (priority, next(self._order), url))
+        return True
+
+    def pop(self) -> str:
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class CrawlStats:
+    def __init__(self):
+        self.fetched = 0
+        self.requests = 0
+        self.pages = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.sitemap_urls = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def requests_per_page(self) -> float:
+        return self.requests / self.pages if self.pages else 0.0
+
+    def __str__(self):
+        return (f"{self.pages} pages ({self.requests} requests, {self.not_modified} not modified, "
+                f"{self.unchanged} unchanged per sitemap, {self.errors} errors; {self.sitemap_urls} sitemap URLs) "
+                f"in {self.elapsed:.2f}s — {self.pages_per_sec:.1f} pages/s, {self.requests_per_page:.2f} requests/page")
+
+
+class Crawler:
+    """Concurrent same-domain crawler: a thread pool of fetchers fed from a shared frontier.
+
+    URLs are canonicalized before they are queued, so fragments, trailing slashes and
+    tracking parameters never cost a second fetch. Each page is still fetched in the form it
+    was first linked as, since the canonical form may only be reachable through a redirect.
+    The frontier is seeded from the site's sitemaps, most recently modified first, and
+    robots.txt rules and Crawl-delay are honoured.
+
+    With a `store`, pages seen on a previous run are re-fetched with a conditional GET and a
+    304 is served from the store without downloading or parsing the page again.
+
+    HTML parsing is CPU-bound, so it is handed to a process pool of `parse_workers`; the
+    fetching thread blocks on the result without holding the GIL and other fetches proceed.
+    """
+
+    def __init__(self, max_pages: int = 20, max_workers: int = CRAWL_CONCURRENCY,
+                 host_budget: HostBudget = None, timeout: float = CRAWL_TIMEOUT,
+                 store: CrawlStore = None, extractor=None, parse_workers: int = CRAWL_PARSE_WORKERS,
+                 use_sitemap: bool = CRAWL_USE_SITEMAP, user_agent: str = CRAWL_USER_AGENT):
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.host_budget = host_budget or HostBudget()
+        self.timeout = timeout
+        self.store = store
+        self.extractor = extractor or get_extractor()
+        self.parse_workers = parse_workers
+        self.use_sitemap = use_sitemap
+        self.user_agent = user_agent
+        self._parse_pool = None
+        # canonical URL → URL to request: the form it was linked as, or where it last redirected
+        self._fetch_as = {}
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.last_stats = None
+
+    def _fetch(self, url: str, lastmod: float = None):
+        """Fetch and parse one page. Returns (page or None, outgoing links, source), where
+        source is "fetched", "not_modified" (a 304 served from the store) or "unchanged"
+        (the sitemap lastmod predates the stored copy, so no request was made)."""
+        if self.store and lastmod is not None:
+            cached = self.store.get(url)
+            if cached and cached["fetched_at"] >= lastmod:
+                return {"url": url, "content": cached["content"]}, cached["links"], "unchanged"
+        headers = self.store.conditional_headers(url) if self.store else {}
+        host = host_of(url)
+        self.host_budget.acquire(host)
+        try:
+            with span("fetch", url=url) as s:
+                response = self.session.get(self._fetch_as.get(url, url), headers=headers, timeout=self.timeout)
+                s.set(status=response.status_code, bytes=len(response.content))
+        finally:
+            self.host_budget.release(host)
+        if response.status_code == 304 and self.store:
+            cached = self.store.get(url)
+            if cached:
+                self.store.touch(url)
+                return {"url": url, "content": cached["content"]}, cached["links"], "not_modified"
+        if response.status_code != 200:
+            return None, [], "fetched"
+        # Extractors emit one block per line so the dedup stage can spot repeated blocks. Links
+        # resolve against the URL actually served (trailing slash and all), not the canonical one
+        with span("parse", url=url):
+            # Bytes, not response.text: the extractor honours the page's own charset declaration
+            encoding = _declared_charset(response)
+            if self._parse_pool:
+                text, links = self._parse_pool.submit(self.extractor, response.content, response.url, encoding).result()
+            else:
+                text, links = self.extractor(response.content, response.url, encoding)
+        # A redirect is recorded under where it landed, so the crawl loop can drop duplicates
+        final_url = canonicalize(response.url) or url
+        self._fetch_as[final_url] = response.url
+        if self.store:
+            self.store.put(final_url, text, links,
+                           etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"))
+        return {"url": final_url, "content": text}, links, "fetched"
+
+    def _seed(self, frontier: Frontier, start_url: str, stats: CrawlStats):
+        """Apply robots.txt to the start host and queue its sitemap entries, newest first.
+        Returns the SiteRules, or None when sitemap/robots support is off."""
+        if not self.use_sitemap:
+            return None
+        site = start_url.split("://", 1)[0] + "://" + host_of(start_url)
+        rules = SiteRules.fetch(self.session, site, self.user_agent, self.timeout)
+        if rules.crawl_delay:
+            self.host_budget.set_delay(host_of(start_url), rules.crawl_delay)
+        entries = fetch_sitemap_urls(self.session, rules.sitemaps or [site + "/sitemap.xml"], self.timeout)
+        for link, lastmod in entries:
+            # Undated entries sort after dated ones
+            if self._queue(frontier, link, host_of(start_url), rules, (SITEMAP_TIER, -(lastmod or 0.0)), lastmod):
+                stats.sitemap_urls += 1
+        return rules
+
+    def _queue(self, frontier: Frontier, link: str, site_host: str, rules, priority=(LINK_TIER,),
+               lastmod: float = None) -> bool:
+        """Queue `link` under its canonical URL if it is an allowed page on the site and new."""
+        url = canonicalize(link)
+        if not url or host_of(url) != site_host or (rules is not None and not rules.allowed(url)):
+            return False
+        if not frontier.push(url, priority, lastmod):
+            return False
+        self._fetch_as.setdefault(url, urldefrag(link)[0])
+        return True
+
+    def crawl(self, start_url: str):
+        stats = CrawlStats()
+        frontier = Frontier()
+        self._fetch_as = {}
+        requested_url, start_url = start_url, canonicalize(start_url) or start_url
+        site_host = host_of(start_url)
+        frontier.push(start_url, (START_TIER,))
+        self._fetch_as[start_url] = urldefrag(requested_url)[0]
+        pages = []
+        page_urls = set()
+        in_flight = {}
+        started = time.perf_counter()
+        rules = self._seed(frontier, start_url, stats)
+
+        if self.parse_workers:
+            self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while frontier or in_flight:
+                    while frontier and len(in_flight) < self.max_workers and stats.fetched < self.max_pages:
+                        url = frontier.pop()
+                        in_flight[pool.submit(self._fetch, url, frontier.lastmod.get(url))] = url
+                        stats.fetched += 1
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = in_flight.pop(future)
+                        try:
+                            page, links, source = future.result()
+                        except Exception as e:
+                            stats.errors += 1
+                            stats.requests += 1
+                            print(f"Error fetching {url}: {e}")
+                            continue
+                        if source != "unchanged":
+                            stats.requests += 1
+                        if source == "not_modified":
+                            stats.not_modified += 1
+                        elif source == "unchanged":
+                            stats.unchanged += 1
+                        if page and page["url"] not in page_urls:
+                            page_urls.add(page["url"])
+                            # The start page leads whatever order the fetches finish in; dedup
+                            # keeps site-wide blocks on the first page
+                            if url == start_url:
+                                pages.insert(0, page)
+                            else:
+                                pages.append(page)
+                        for link in links:
+                            self._queue(frontier, link, site_host, rules)
+        finally:
+            if self._parse_pool:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+
+        stats.pages = len(pages)
+        stats.elapsed = time.perf_counter() - started
+        self.last_stats = stats
+        print(f"🕸️ Crawled {stats}")
+        return pages
+
+
+def crawl_website(start_url, max_pages=20, max_workers=CRAWL_CONCURRENCY, store: CrawlStore = None, dedup: bool = True):
+    """Crawl `start_url` and return a list of {"url", "content", "digest"} dicts, with
+    site-wide boilerplate and near-duplicate pages removed unless `dedup` is False."""
+    pages = Crawler(max_pages=max_pages, max_workers=max_workers, store=store).crawl(start_url)
+    if dedup:
+        pages, _ = dedup_pages(pages)
+    # Digested after boilerplate removal, so nav and footer text stays out of them
+    for page in pages:
+        page["digest"] = store.digest(page["content"]) if store else summarize(page["content"])
+    return pages
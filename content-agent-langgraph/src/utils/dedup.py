@@ -0,0 +1,124 @@
+import hashlib
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# A block that shows up on at least this share of pages (and at least BOILERPLATE_MIN_PAGES
+# pages) is treated as site chrome: nav bars, footers, hero banners.
+BOILERPLATE_MIN_FRACTION = 0.5
+BOILERPLATE_MIN_PAGES = 3
+# Pages whose SimHash fingerprints differ in at most this many bits are near-duplicates.
+NEAR_DUPLICATE_BITS = 3
+
+
+def _normalize(block: str) -> str:
+    return re.sub(r"\s+", " ", block).strip().lower()
+
+
+def block_key(block: str) -> bytes:
+    return hashlib.blake2b(_normalize(block).encode("utf-8"), digest_size=8).digest()
+
+
+def split_blocks(text: str):
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    digests = b"".join(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest() for sh in shingles)
+    # One row of 64 bits per shingle (bit i of the little-endian hash in column i), summed per column
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    weights = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return sum(1 << bit for bit in np.flatnonzero(weights > 0).tolist())
+
+
+class DedupStats:
+    def __init__(self):
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.blocks_removed = 0
+        self.pages_collapsed = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def tokens_saved(self) -> int:
+        # ~4 bytes per token for English prose
+        return self.bytes_saved // 4
+
+    def __str__(self):
+        return (f"removed {self.blocks_removed} repeated blocks, collapsed {self.pages_collapsed} "
+                f"near-duplicate pages, saved {self.bytes_saved} bytes (~{self.tokens_saved} tokens)")
+
+
+def site_wide_blocks(page_blocks) -> set:
+    """Keys of the blocks found on most of the pages, given each page's blocks."""
+    doc_freq = Counter()
+    for blocks in page_blocks:
+        doc_freq.update({block_key(block) for block in blocks})
+    threshold = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_FRACTION * len(page_blocks))
+    return {key for key, count in doc_freq.items() if count >= threshold}
+
+
+def remove_boilerplate(pages, stats: DedupStats):
+    """Strip blocks repeated within a page and blocks repeated across most pages.
+    Site-wide blocks are kept once, on the first page; Crawler.crawl puts the start page first."""
+    page_blocks = [split_blocks(page["content"]) for page in pages]
+    site_wide = site_wide_blocks(page_blocks)
+
+    kept_site_wide = set()
+    cleaned = []
+    for page, blocks in zip(pages, page_blocks):
+        seen = set()
+        kept = []
+        for block in blocks:
+            key = block_key(block)
+            if key in seen or (key in site_wide and key in kept_site_wide):
+                stats.blocks_removed += 1
+                continue
+            seen.add(key)
+            if key in site_wide:
+                kept_site_wide.add(key)
+            kept.append(block)
+        cleaned.append({**page, "content": "\n".join(kept)})
+    return cleaned
+
+
+def collapse_near_duplicates(pages, stats: DedupStats, max_bits: int = NEAR_DUPLICATE_BITS):
+    """Drop pages whose text is a near-duplicate of an earlier page (query-string variants,
+    print views, ...). Candidates are found by banding the 64-bit SimHash into
+    max_bits + 1 bands: two fingerprints within max_bits must agree on at least one band."""
+    bands = max_bits + 1
+    width = 64 // bands
+    mask = (1 << width) - 1
+    buckets = defaultdict(list)
+    kept = []
+    for page in pages:
+        fingerprint = simhash(page["content"])
+        band_keys = [(band, (fingerprint >> (band * width)) & mask) for band in range(bands)]
+        duplicate = any(
+            bin(fingerprint ^ other).count("1") <= max_bits
+            for key in band_keys for other in buckets[key]
+        )
+        if duplicate:
+            stats.pages_collapsed += 1
+            continue
+        for key in band_keys:
+            buckets[key].append(fingerprint)
+        kept.append(page)
+    return kept
+
+
+def dedup_pages(pages):
+    """Remove boilerplate blocks and near-duplicate pages. Returns (pages, DedupStats)."""
+    stats = DedupStats()
+    stats.bytes_before = sum(len(page["content"].encode("utf-8")) for page in pages)
+    pages = remove_boilerplate(pages, stats)
+    pages = [page for page in collapse_near_duplicates(pages, stats) if page["content"]]
+    stats.bytes_after = sum(len(page["content"].encode("utf-8")) for page in pages)
+    print(f"🧹 Dedup: {stats}")
+    return pages, stats
@@ -0,0 +1,47 @@
+import os
+import re
+from collections import Counter
+
+# Longest digest kept per page
+DIGEST_MAX_CHARS = int(os.getenv("DIGEST_MAX_CHARS", "400"))
+
+SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD = re.compile(r"[a-z0-9][a-z0-9'-]+")
+STOPWORDS = frozenset("""
+a about an and are as at be but by can for from has have how in into is it its more not of on or our
+that the their them they this to we what when which who will with you your
+""".split())
+# Sentences with fewer words are menu items, buttons and captions, not content
+MIN_SENTENCE_WORDS = 5
+
+
+def _clip(sentence: str, limit: int) -> str:
+    # Unpunctuated text arrives as one long "sentence"; keep its start so it can still be picked
+    return sentence if len(sentence) <= limit else sentence[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def summarize(text: str, max_chars: int = DIGEST_MAX_CHARS) -> str:
+    """Extractive digest of a page: its heading, then the sentences that carry the most of
+    the page's frequent words, kept in page order, up to max_chars."""
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+    if not lines:
+        return ""
+    title = lines[0] if len(lines[0].split()) < MIN_SENTENCE_WORDS else ""
+    sentences = [_clip(s.strip(), max_chars // 2) for s in SENTENCE.split(text) if len(s.split()) >= MIN_SENTENCE_WORDS]
+    words = [[w for w in WORD.findall(s.lower()) if w not in STOPWORDS] for s in sentences]
+    freq = Counter(w for sentence_words in words for w in set(sentence_words))
+    # Average weight of a sentence's words, with a lift for the opening sentences
+    scores = [sum(freq[w] for w in set(ws)) / (len(ws) + 1) * (1.5 if i < 2 else 1.0)
+              for i, ws in enumerate(words)]
+    budget = max_chars - len(title)
+    chosen = []
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        if len(sentences[i]) + 1 <= budget:
+            chosen.append(i)
+            budget -= len(sentences[i]) + 1
+    body = " ".join(sentences[i] for i in sorted(chosen))
+    return f"{title}: {body}" if title and body else (title or body or lines[0][:max_chars])
+
+
+def format_digests(digests) -> str:
+    return "\n".join(f"{i+1}. {digest}" for i, digest in enumerate(digests))
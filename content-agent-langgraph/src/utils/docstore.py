@@ -0,0 +1,111 @@
+import mmap
+import os
+import sys
+import threading
+
+from utils.paths import CACHE_DIR
+
+DOCSTORE_PATH = os.getenv("DOCSTORE_PATH", os.path.join(CACHE_DIR, "docs.bin"))
+
+
+class Doc:
+    """One crawled page: its source URL and where its text sits in the store's file.
+
+    Exposes `page_content` and `metadata` like the chunks the index returns, so the
+    prompt and retrieval code take either. The text is decoded on each access, never kept.
+    """
+    __slots__ = ("source", "offset", "length", "_store")
+
+    def __init__(self, store, source: str, offset: int, length: int):
+        self._store = store
+        self.source = source
+        self.offset = offset
+        self.length = length
+
+    @property
+    def page_content(self) -> str:
+        return self._store.read(self.offset, self.length)
+
+    @property
+    def metadata(self) -> dict:
+        return {"source": self.source}
+
+    def __repr__(self):
+        return f"Doc({self.source!r}, {self.length} bytes)"
+
+
+class DocStore:
+    """Append-only page store: all page text in one file, memory-mapped and read by offset.
+
+    Only a small `Doc` record per page stays on the heap, so a crawl of thousands of pages
+    costs little memory and the OS pages text in and out as prompts need it. Iterating
+    yields docs in crawl order; `get(url)` looks one up by its (interned) source URL.
+    """
+
+    def __init__(self, path: str = DOCSTORE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        # Start from a new file renamed over the old one: a store from an earlier load may
+        # still have the old file mapped and be serving reads from it
+        open(path + ".tmp", "wb").close()
+        os.replace(path + ".tmp", path)
+        self._file = open(path, "a+b")
+        self._size = 0
+        self._map = None
+        self._docs = []
+        self._by_source = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pages(cls, pages, path: str = DOCSTORE_PATH):
+        """Store crawler output ({"url", "content"} dicts)."""
+        store = cls(path)
+        for page in pages:
+            store.add(page["url"], page["content"])
+        return store
+
+    def add(self, source: str, text: str) -> Doc:
+        data = text.encode("utf-8")
+        with self._lock:
+            self._file.write(data)
+            doc = Doc(self, sys.intern(source), self._size, len(data))
+            self._size += len(data)
+            self._docs.append(doc)
+            self._by_source[doc.source] = doc
+        return doc
+
+    def read(self, offset: int, length: int) -> str:
+        if not length:
+            return ""
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                # Text appended since the file was last mapped: map it again at its new size
+                self._file.flush()
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length].decode("utf-8")
+
+    def get(self, source: str):
+        return self._by_source.get(source)
+
+    def __iter__(self):
+        return iter(self._docs)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __getitem__(self, item):
+        return self._docs[item]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.paths import CACHE_DIR, open_sqlite
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.db"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite cache of embedding vectors keyed by (model name, chunk text hash), bounded to
+    `max_entries` with least-recently-used eviction."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: list) -> dict:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype="float32")
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, digest) for digest in found])
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, digest, np.asarray(vector, dtype="float32").tobytes(), now)
+                 for digest, vector in items.items()])
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+
+
+class CachedEmbedder:
+    """Wraps an embedder so only texts missing from the cache are sent to the model."""
+
+    def __init__(self, embedder, cache: EmbeddingCache = None):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.cache = cache or EmbeddingCache()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: list) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(self.name, list(set(hashes)))
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in cached:
+                missing.setdefault(digest, text)
+        self.hits += len(texts) - sum(1 for digest in hashes if digest in missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = self.embedder.embed(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.name, fresh)
+            cached.update(fresh)
+        return np.vstack([cached[digest] for digest in hashes]).astype("float32")
@@ -0,0 +1,87 @@
+import os
+import re
+from urllib.parse import urljoin
+
+import lxml.etree
+import lxml.html
+
+EXTRACTOR = os.getenv("EXTRACTOR", "lxml")
+
+# Subtrees that never carry page copy
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+# Site chrome: its text is dropped but its links still feed the crawl frontier
+CHROME_TAGS = {"nav"}
+# A <meta charset>, http-equiv Content-Type or XML declaration near the top of the document
+DECLARED_CHARSET = re.compile(rb"charset\s*=|encoding\s*=", re.IGNORECASE)
+
+
+def extract_bs4(html, url: str, encoding: str = None):
+    """Reference extractor: BeautifulSoup's pure-Python parser. Returns (text, links)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser', **({"from_encoding": encoding} if isinstance(html, bytes) else {}))
+    base = soup.find('base', href=True)
+    if base:
+        url = urljoin(url, base['href'])
+    links = [urljoin(url, link['href']) for link in soup.find_all('a', href=True)]
+    for tag in soup(list(SKIP_TAGS | CHROME_TAGS)):
+        tag.decompose()
+    text = soup.get_text(separator='\n', strip=True)
+    return text, links
+
+
+def extract_lxml(html, url: str, encoding: str = None):
+    """Fast path: one walk over the lxml (libxml2) tree collecting visible text and links.
+    Returns (text, links).
+
+    Give it the raw bytes: lxml rejects str input that starts with an XML encoding
+    declaration. `encoding` is the charset from the Content-Type header, if any; otherwise
+    lxml reads the document's own declaration.
+    """
+    if not html.strip():
+        return "", []
+    if isinstance(html, bytes) and not encoding and not DECLARED_CHARSET.search(html[:2048]):
+        # libxml2 would read an undeclared document as Latin-1; most of the web is UTF-8
+        try:
+            html.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            pass
+    try:
+        parser = lxml.html.HTMLParser(encoding=encoding) if encoding and isinstance(html, bytes) else None
+        root = lxml.html.fromstring(html, parser=parser)
+    except lxml.etree.ParserError:
+        # Nothing but comments or whitespace
+        return "", []
+    # Relative links resolve against <base href> when the page declares one
+    base = root.xpath("//base/@href")
+    if base:
+        url = urljoin(url, base[0].strip())
+    blocks = []
+    links = []
+    # (element, text visible inside it, emit its tail instead of descending)
+    stack = [(root, True, False)]
+    while stack:
+        element, visible, tail_only = stack.pop()
+        if tail_only:
+            if visible and element.tail and element.tail.strip():
+                blocks.append(element.tail.strip())
+            continue
+        # The tail follows the element in document order, so push it first
+        stack.append((element, visible, True))
+        tag = element.tag.lower() if isinstance(element.tag, str) else None
+        if tag is None or tag in SKIP_TAGS:
+            continue
+        if tag == "a" and element.get("href"):
+            links.append(urljoin(url, element.get("href")))
+        inner_visible = visible and tag not in CHROME_TAGS
+        if inner_visible and element.text and element.text.strip():
+            blocks.append(element.text.strip())
+        stack.extend((child, inner_visible, False) for child in reversed(element))
+    return "\n".join(blocks), links
+
+
+EXTRACTORS = {"lxml": extract_lxml, "bs4": extract_bs4}
+
+
+def get_extractor(name: str = EXTRACTOR):
+    return EXTRACTORS[name]
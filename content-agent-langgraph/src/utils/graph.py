@@ -0,0 +1,145 @@
+import json
+import os
+import random
+import time
+from urllib.parse import urlencode
+
+# Graph accepts at most this many calls in one batch request
+GRAPH_BATCH_MAX = 50
+CONTAINER_POLL_TIMEOUT = float(os.getenv("CONTAINER_POLL_TIMEOUT", "120"))
+# First wait between status polls; it grows by half each round up to the cap
+CONTAINER_POLL_INITIAL = float(os.getenv("CONTAINER_POLL_INITIAL", "0.5"))
+CONTAINER_POLL_MAX = float(os.getenv("CONTAINER_POLL_MAX", "5"))
+
+
+class GraphError(Exception):
+    def __init__(self, message: str, code: int = None, status: int = None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+def _parse(status: int, body):
+    """A Graph response body → dict, or a GraphError for an error response."""
+    data = json.loads(body) if isinstance(body, (str, bytes)) and body else (body or {})
+    if status >= 400 or (isinstance(data, dict) and "error" in data):
+        error = data.get("error", {}) if isinstance(data, dict) else {}
+        return GraphError(error.get("message") or f"HTTP {status}", error.get("code"), status)
+    return data
+
+
+class GraphAPI:
+    """Graph API calls made with one page token.
+
+    Independent calls can be sent together through the batch endpoint, one HTTP round-trip
+    for up to 50 of them. Instagram media containers are polled until their status_code is
+    FINISHED before they are published, since publishing a container that is still
+    processing fails.
+    """
+
+    def __init__(self, client, access_token: str):
+        self.client = client
+        self.access_token = access_token
+
+    def call(self, method: str, path: str, params: dict = None) -> dict:
+        """One Graph call. Returns the parsed body; raises GraphError on an error response."""
+        params = {**(params or {}), "access_token": self.access_token}
+        if method == "GET":
+            response = self.client.get(path, params=params)
+        else:
+            response = self.client.request(method, path, data=params)
+        result = _parse(response.status_code, response.text)
+        if isinstance(result, GraphError):
+            raise result
+        return result
+
+    def batch(self, calls: list) -> list:
+        """Run [(method, path, params)] through the batch endpoint. Returns, in order, the
+        parsed body or a GraphError for each call; one failing call does not fail the rest."""
+        if len(calls) == 1:
+            # A batch of one is only overhead
+            try:
+                return [self.call(*calls[0])]
+            except GraphError as e:
+                return [e]
+        results = []
+        for start in range(0, len(calls), GRAPH_BATCH_MAX):
+            chunk = calls[start:start + GRAPH_BATCH_MAX]
+            operations = []
+            for method, path, params in chunk:
+                operation = {"method": method, "relative_url": path}
+                if params and method == "GET":
+                    operation["relative_url"] += ("&" if "?" in path else "?") + urlencode(params)
+                elif params:
+                    operation["body"] = urlencode(params)
+                operations.append(operation)
+            response = self.client.post("", data={"batch": json.dumps(operations), "include_headers": "false",
+                                                  "access_token": self.access_token})
+            response.raise_for_status()
+            for item in response.json():
+                # Graph answers null for a call it did not get to within the batch time limit
+                if item is None:
+                    results.append(GraphError("no response within the batch time limit"))
+                else:
+                    results.append(_parse(item.get("code", 200), item.get("body")))
+        return results
+
+    def create_containers(self, user_id: str, items: list) -> list:
+        """Create an Instagram media container for each params dict, all in one batch.
+        Returns the container ids; raises GraphError if any creation failed."""
+        results = self.batch([("POST", f"{user_id}/media", params) for params in items])
+        for result in results:
+            if isinstance(result, GraphError):
+                raise result
+        return [result["id"] for result in results]
+
+    def wait_until_ready(self, container_ids: list, timeout: float = CONTAINER_POLL_TIMEOUT):
+        """Block until every container reports status_code FINISHED. All pending containers
+        are checked in one batched call per round, with a growing pause between rounds."""
+        pending = list(container_ids)
+        delay = CONTAINER_POLL_INITIAL
+        deadline = time.monotonic() + timeout
+        while pending:
+            results = self.batch([("GET", container_id, {"fields": "status_code"}) for container_id in pending])
+            still_pending = []
+            for container_id, result in zip(pending, results):
+                # An error on the status call itself is treated as "not ready yet"
+                status = None if isinstance(result, GraphError) else result.get("status_code")
+                if status in ("ERROR", "EXPIRED"):
+                    raise GraphError(f"container {container_id} is {status}")
+                if status != "FINISHED":
+                    still_pending.append(container_id)
+            pending = still_pending
+            if not pending:
+                return
+            if time.monotonic() + delay > deadline:
+                raise GraphError(f"containers {', '.join(pending)} not ready after {timeout:.0f}s")
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(CONTAINER_POLL_MAX, delay * 1.5)
+
+    def publish_container(self, user_id: str, container_id: str, **params) -> str:
+        self.wait_until_ready([container_id])
+        return self.call("POST", f"{user_id}/media_publish", {"creation_id": container_id, **params})["id"]
+
+    def publish_instagram(self, user_id: str, caption: str, image_urls: list) -> str:
+        """Publish one image, or a carousel when given several. Carousel items are created
+        together in one batch and must all be ready before the carousel container is made."""
+        return self.finish_instagram(user_id, caption,
+                                     self.create_containers(user_id, instagram_items(caption, image_urls)))
+
+    def finish_instagram(self, user_id: str, caption: str, container_ids: list) -> str:
+        """Publish the containers made from instagram_items(caption, ...): the one image
+        container, or the carousel of its item containers."""
+        if len(container_ids) == 1:
+            return self.publish_container(user_id, container_ids[0])
+        self.wait_until_ready(container_ids)
+        (container_id,) = self.create_containers(user_id, [{"media_type": "CAROUSEL", "caption": caption,
+                                                            "children": ",".join(container_ids)}])
+        return self.publish_container(user_id, container_id)
+
+
+def instagram_items(caption: str, image_urls: list) -> list:
+    """Container params for an Instagram post: one captioned image, or carousel items."""
+    if len(image_urls) == 1:
+        return [{"image_url": image_urls[0], "caption": caption}]
+    return [{"image_url": url, "is_carousel_item": "true"} for url in image_urls]
@@ -0,0 +1,212 @@
+import io
+import os
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from utils.telemetry import span
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Statuses worth retrying. POSTs create content, so they are only retried on statuses that
+# mean the request was not acted on (429, 503), or when the connection was never opened.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+UNPROCESSED_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+def parse_retry_after(value) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def never_sent(error: Exception) -> bool:
+    """Whether a request failed before any of it left the client: the connection could not
+    be opened. A connection aborted or reset later may have delivered the whole request."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying failure;
+    # NewConnectionError (refused, unresolvable host) is a ConnectTimeoutError subclass
+    reason = getattr(error.args[0], "reason", error.args[0])
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed call certainly did nothing and may succeed later: the connection
+    was never made, or the platform answered 429/503. Other failures may have posted."""
+    if never_sent(error):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(error, "status", None) or getattr(response, "status_code", None)
+    return status in UNPROCESSED_STATUSES
+
+
+def rewind_bodies(kwargs: dict):
+    """A send consumes file bodies; put them back at the start before a retry resends them."""
+    files = (kwargs.get("files") or {}).values()
+    for body in [kwargs.get("data")] + [f[1] if isinstance(f, tuple) else f for f in files]:
+        if hasattr(body, "seek"):
+            body.seek(0)
+
+
+class MultipartFile:
+    """multipart/form-data body of plain fields plus one file that is read from disk as it
+    is sent. Given `files=`, requests would assemble the whole body in memory first; this
+    object has read() and a length, so requests streams it with a Content-Length instead.
+    Send it as `data=` with `headers={"Content-Type": body.content_type}`.
+    """
+
+    def __init__(self, fields: dict, name: str, path: str, content_type: str, filename: str = None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = "".join(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'
+                       for key, value in fields.items() if value is not None)
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                 f'filename="{filename or os.path.basename(path)}"\r\nContent-Type: {content_type}\r\n\r\n')
+        self._head = head.encode("utf-8")
+        self._tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+        self.path = path
+        self._length = len(self._head) + os.path.getsize(path) + len(self._tail)
+        self._parts = []
+        self.seek(0)
+
+    def __len__(self):
+        return self._length
+
+    def seek(self, offset: int, whence: int = 0):
+        if offset or whence:
+            raise io.UnsupportedOperation("MultipartFile can only be rewound to the start")
+        self.close()
+        self._parts = [io.BytesIO(self._head), open(self.path, "rb"), io.BytesIO(self._tail)]
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while self._parts and size != 0:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0).close()
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+
+class PlatformClient:
+    """Pooled keep-alive HTTP client for one platform's API.
+
+    Requests go through a shared requests.Session, so TCP+TLS connections are reused. Failures
+    are retried with exponential backoff and full jitter, and a Retry-After from the server
+    pauses every request on this client until it has passed, not only the one that got it.
+    """
+
+    def __init__(self, name: str, base_url: str = "", headers: dict = None, pool_size: int = HTTP_POOL_SIZE,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self._throttle_lock = threading.Lock()
+        self._throttled_until = 0.0
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _throttle(self, seconds: float):
+        with self._throttle_lock:
+            self._throttled_until = max(self._throttled_until, time.monotonic() + seconds)
+
+    def _wait_for_throttle(self):
+        with self._throttle_lock:
+            wait = self._throttled_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _should_retry(self, method: str, status: int) -> bool:
+        if method in IDEMPOTENT_METHODS:
+            return status in RETRY_STATUSES
+        return status in UNPROCESSED_STATUSES
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        method = method.upper()
+        with span("http", client=self.name, method=method, path=path.split("?")[0]) as s:
+            response = self._request(method, self.url(path), **kwargs)
+            s.set(status=response.status_code)
+            return response
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                rewind_bodies(kwargs)
+            self._wait_for_throttle()
+            last = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A read timeout or a dropped connection may come after the server got the
+                # request, so a non-idempotent one is only retried if it was never sent
+                if last or (method not in IDEMPOTENT_METHODS and not never_sent(e)):
+                    raise
+                delay = self._backoff(attempt)
+                print(f"⏳ {self.name}: {type(e).__name__}, retrying in {delay:.1f}s")
+            else:
+                if last or not self._should_retry(method, response.status_code):
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    # Every caller on this client waits it out at the top of its next attempt
+                    self._throttle(retry_after)
+                    print(f"⏳ {self.name}: HTTP {response.status_code}, retrying after {retry_after:.1f}s")
+                    continue
+                delay = self._backoff(attempt)
+                print(f"⏳ {self.name}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
@@ -0,0 +1,213 @@
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+from utils.http_client import PlatformClient
+from utils.paths import CACHE_DIR, open_sqlite
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(CACHE_DIR, "images"))
+IMAGE_STORE_MAX_BYTES = int(float(os.getenv("IMAGE_STORE_MAX_MB", "500")) * 1024 * 1024)
+# Public URL that IMAGE_STORE_DIR is served from. Instagram only accepts image URLs, so without
+# it Instagram is handed the original (expiring) URL rather than a stored rendition
+IMAGE_PUBLIC_BASE_URL = os.getenv("IMAGE_PUBLIC_BASE_URL")
+
+# Per-platform renditions: longest side in pixels, file size cap and, for Instagram, the
+# accepted width/height range (anything outside it is centre-cropped)
+RENDITIONS = {
+    "facebook": {"max_side": 2048, "max_bytes": 4 * 1024 * 1024, "format": "JPEG"},
+    "instagram": {"max_side": 1440, "max_bytes": 8 * 1024 * 1024, "format": "JPEG", "aspect": (4 / 5, 1.91)},
+    "linkedin": {"max_side": 1920, "max_bytes": 5 * 1024 * 1024, "format": "JPEG"},
+    "twitter": {"max_side": 4096, "max_bytes": 5 * 1024 * 1024, "format": "JPEG"},
+}
+FORMATS = {"JPEG": (".jpg", "image/jpeg"), "WEBP": (".webp", "image/webp")}
+QUALITIES = (90, 82, 74, 66, 58, 50)
+CHUNK_SIZE = 64 * 1024
+# Files used this recently may be mid-upload and are never evicted
+EVICTION_GRACE = 300.0
+
+download_client = PlatformClient("download")
+_pillow_missing_reported = False
+
+
+def render(source: str, target: str, spec: dict) -> int:
+    """Write `source` resized, cropped and recompressed to fit `spec`. Returns the file size."""
+    # Imported here: Pillow is only needed once an image is actually posted
+    from PIL import Image
+    tmp = target + ".tmp"
+    with Image.open(source) as original:
+        image = original.convert("RGB")
+    low, high = spec.get("aspect", (0.0, float("inf")))
+    width, height = image.size
+    if width / height < low:
+        crop = int(width / low)
+        image = image.crop((0, (height - crop) // 2, width, (height - crop) // 2 + crop))
+    elif width / height > high:
+        crop = int(height * high)
+        image = image.crop(((width - crop) // 2, 0, (width - crop) // 2 + crop, height))
+    image.thumbnail((spec["max_side"], spec["max_side"]), Image.LANCZOS)
+    for quality in QUALITIES:
+        image.save(tmp, spec["format"], quality=quality, optimize=True)
+        if os.path.getsize(tmp) <= spec["max_bytes"]:
+            break
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+class ImageStore:
+    """Content-addressed on-disk image cache with per-platform renditions.
+
+    Each source URL is downloaded once, streamed to a file named by its SHA-256, so a post
+    scheduled days ahead still has its image after the DALL-E URL expires. Renditions are
+    derived files beside it. Files are evicted least recently used first once the store
+    grows past `max_bytes`.
+    """
+
+    def __init__(self, root: str = IMAGE_STORE_DIR, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._conn = open_sqlite(os.path.join(root, "index.db"))
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sources (url TEXT PRIMARY KEY, name TEXT NOT NULL)")
+        self._conn.commit()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _key_lock(self, key: str):
+        # One download or render per key at a time; concurrent callers wait and then hit
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _touch(self, name: str) -> bool:
+        """Mark `name` used; False if the store no longer holds it."""
+        with self._lock:
+            updated = self._conn.execute("UPDATE files SET last_used = ? WHERE name = ?", (time.time(), name)).rowcount
+            if updated and not os.path.exists(self.path(name)):
+                self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+                updated = 0
+            self._conn.commit()
+        return bool(updated)
+
+    def _add(self, name: str, size: int, url: str = None):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO files (name, size, last_used) VALUES (?, ?, ?)",
+                               (name, size, time.time()))
+            if url:
+                self._conn.execute("INSERT OR REPLACE INTO sources (url, name) VALUES (?, ?)", (url, name))
+            self._conn.commit()
+
+    def _source(self, url: str):
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM sources WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def _download(self, url: str) -> tuple:
+        response = download_client.get(url, stream=True)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0] or mimetypes.guess_type(url)[0]
+        digest = hashlib.sha256()
+        size = 0
+        tmp = self.path(f".download-{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        name = digest.hexdigest() + (mimetypes.guess_extension(content_type or "") or ".jpg")
+        os.replace(tmp, self.path(name))
+        return name, size
+
+    def fetch(self, url: str) -> str:
+        """Path of the stored original for `url`, downloading it only if the store lacks it."""
+        with self._key_lock(url):
+            name = self._source(url)
+            if name and self._touch(name):
+                return self.path(name)
+            name, size = self._download(url)
+            self._add(name, size, url)
+        self._evict()
+        return self.path(name)
+
+    def rendition(self, url: str, platform: str) -> tuple:
+        """(path, content type) of `url`'s image fitted to `platform`'s limits."""
+        spec = RENDITIONS.get(platform)
+        original = self.fetch(url)
+        if spec is None:
+            return original, mimetypes.guess_type(original)[0] or "image/jpeg"
+        extension, content_type = FORMATS[spec["format"]]
+        name = os.path.basename(original).split(".")[0] + f".{platform}{extension}"
+        with self._key_lock(name):
+            if not self._touch(name):
+                try:
+                    size = render(original, self.path(name), spec)
+                except ImportError:
+                    # Said once per process rather than on every post
+                    global _pillow_missing_reported
+                    if not _pillow_missing_reported:
+                        _pillow_missing_reported = True
+                        print("⚠️ Pillow is not installed, so images are posted without platform renditions "
+                              "(pip install Pillow)")
+                    return original, mimetypes.guess_type(original)[0] or "image/jpeg"
+                except OSError as e:
+                    # An image Pillow cannot decode: the platform may still take it
+                    print(f"⚠️ Could not prepare the {platform} rendition, posting the original: {e}")
+                    return original, mimetypes.guess_type(original)[0] or "image/jpeg"
+                self._add(name, size)
+        self._evict()
+        return self.path(name), content_type
+
+    def public_url(self, url: str, platform: str) -> str:
+        """URL a platform can fetch the image from: the stored rendition under
+        IMAGE_PUBLIC_BASE_URL when that is set, else the original URL."""
+        if not IMAGE_PUBLIC_BASE_URL:
+            return url
+        path, _ = self.rendition(url, platform)
+        return f"{IMAGE_PUBLIC_BASE_URL.rstrip('/')}/{os.path.basename(path)}"
+
+    def _evict(self):
+        recent = time.time() - EVICTION_GRACE
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()
+            if total <= self.max_bytes:
+                return
+            rows = self._conn.execute("SELECT name, size FROM files WHERE last_used < ? ORDER BY last_used",
+                                      (recent,)).fetchall()
+            for name, size in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path(name))
+                except FileNotFoundError:
+                    pass
+                self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+                total -= size
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        return {"files": files, "bytes": total, "max_bytes": self.max_bytes}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """The process-wide store, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore()
+        return _store
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils.paths import CACHE_DIR, open_sqlite
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.db"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", str(7 * 24 * 3600)))
+# DALL-E URLs expire after about an hour, so cached image URLs must expire before they do
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "3000"))
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(kind: str, model: str, temperature: float = None, prompt: str = "", context: str = "", **extra) -> str:
+    """Key a response by model, temperature, prompt hash and context hash (plus any extra
+    request parameters such as image size)."""
+    parts = {
+        "kind": kind,
+        "model": model,
+        "temperature": temperature,
+        "prompt": sha256(prompt),
+        "context": sha256(context),
+        **extra,
+    }
+    return sha256(json.dumps(parts, sort_keys=True))
+
+
+class ResponseCache:
+    """On-disk cache of LLM responses with per-entry TTL and LRU eviction past `max_entries`."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                # Expired entries go first, then the least recently used
+                self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (max(0, count - self.max_entries),))
+            self._conn.commit()
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0f}% hit rate)"
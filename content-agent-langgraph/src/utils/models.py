@@ -0,0 +1,23 @@
+# src/types/index.py shares its package name with the stdlib ``types`` module, which is
+# always imported before our code runs, so ``from types.index import ...`` cannot work.
+# Load the module by path once and re-export its classes.
+import importlib.util
+import os
+import sys
+
+_NAME = "content_agent_types"
+
+if _NAME not in sys.modules:
+    _path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "types", "index.py")
+    _spec = importlib.util.spec_from_file_location(_NAME, _path)
+    sys.modules[_NAME] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules[_NAME])
+
+_types = sys.modules[_NAME]
+SocialMediaPost = _types.SocialMediaPost
+ApiResponse = _types.ApiResponse
+SocialMediaCredentials = _types.SocialMediaCredentials
+PostResult = _types.PostResult
+ImageGenerationResult = _types.ImageGenerationResult
+CaptionGenerationResult = _types.CaptionGenerationResult
+SocialMediaPlatform = _types.SocialMediaPlatform
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.http_client import is_transient
+from utils.paths import CACHE_DIR, open_sqlite
+
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(CACHE_DIR, "outbox.db"))
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# Longest the scheduler sleeps without re-checking, in case another process enqueued work
+OUTBOX_MAX_IDLE = 60.0
+# A job still running after this many seconds is taken to belong to a process that died. It
+# must exceed the slowest real post: every HTTP retry timing out, plus an Instagram container wait
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "900"))
+
+
+def idempotency_key(platform: str, body: str, image_url: str = None, run_at: float = None,
+                    extra_image_urls: list = None) -> str:
+    """The same post to the same platform for the same time always maps to the same job."""
+    parts = [platform, body, image_url or "", "" if run_at is None else str(int(run_at))]
+    if extra_image_urls:
+        # Only appended when present, so single-image posts keep the keys they always had
+        parts.append("\n".join(extra_image_urls))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """Durable SQLite queue of per-platform posts, for immediate and scheduled posts alike.
+
+    Jobs move pending → running → done/failed. Each job has a unique idempotency key, so
+    enqueueing a post again returns the existing job instead of creating a second one.
+    Delivery is at-least-once: a job that was running when the process died goes back to
+    pending once its lease runs out (`recover`), because there is no way to tell whether its
+    platform call landed.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path, isolation_level=None)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                platform TEXT NOT NULL,
+                body TEXT NOT NULL,
+                image_url TEXT,
+                extra_image_urls TEXT,
+                run_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                post_id TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "extra_image_urls" not in columns:
+            # Newline-separated carousel images, for outboxes created before carousels
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN extra_image_urls TEXT")
+        # Due-job lookups and the next wake-up time are index range scans, never table scans
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)")
+        self.changed = threading.Condition()
+
+    def enqueue(self, platform: str, body: str, image_url: str = None, run_at: float = None, key: str = None,
+                extra_image_urls: list = None):
+        """Queue a post for `run_at` (UTC epoch seconds, default now). Returns (job id, created)."""
+        key = key or idempotency_key(platform, body, image_url, run_at, extra_image_urls)
+        run_at = time.time() if run_at is None else run_at
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (idempotency_key, platform, body, image_url, extra_image_urls, run_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, platform, body, image_url, "\n".join(extra_image_urls) if extra_image_urls else None, run_at,
+                 time.time()))
+            created = cursor.rowcount == 1
+            (job_id,) = self._conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()
+        if created:
+            with self.changed:
+                self.changed.notify_all()
+        return job_id, created
+
+    def claim(self, job_id: int) -> bool:
+        """Atomically move one pending job to running. False if it is done or already claimed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = 'pending'", (time.time(), job_id))
+            return cursor.rowcount == 1
+
+    def claim_due(self, now: float, limit: int):
+        """Claim up to `limit` pending jobs whose run_at has passed, oldest first."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, platform, body, image_url, extra_image_urls, run_at, attempts FROM jobs "
+                    "WHERE status = 'pending' AND run_at <= ? ORDER BY run_at LIMIT ?", (now, limit)).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        keys = ("id", "platform", "body", "image_url", "extra_image_urls", "run_at", "attempts")
+        return [dict(zip(keys, row[:4] + (row[4].split("\n") if row[4] else None, row[5], row[6] + 1)))
+                for row in rows]
+
+    def next_run_at(self):
+        with self._lock:
+            (run_at,) = self._conn.execute("SELECT MIN(run_at) FROM jobs WHERE status = 'pending'").fetchone()
+        return run_at
+
+    def complete(self, job_id: int, post_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'done', post_id = ?, error = NULL, updated_at = ? WHERE id = ?",
+                               (post_id, time.time(), job_id))
+
+    def fail(self, job_id: int, error: str, retry_at: float = None):
+        """Record a failed attempt; with `retry_at` the job goes back to pending for then."""
+        with self._lock:
+            if retry_at is None:
+                self._conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                                   (error, time.time(), job_id))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', error = ?, run_at = ?, updated_at = ? WHERE id = ?",
+                    (error, retry_at, time.time(), job_id))
+        if retry_at is not None:
+            with self.changed:
+                self.changed.notify_all()
+
+    def recover(self, lease: float = OUTBOX_LEASE) -> int:
+        """Return jobs left running by a crashed process to pending. Returns how many.
+
+        Only jobs claimed more than `lease` seconds ago count: a CLI run or the server may be
+        posting the others right now, and re-running them would post twice."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (now, now - lease))
+        return cursor.rowcount
+
+    def status(self, job_id: int):
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class OutboxScheduler:
+    """Fires outbox jobs at their UTC time on a worker pool.
+
+    The loop claims only jobs that are due, then sleeps until the earliest pending run_at
+    (or until an enqueue wakes it), so thousands of future jobs cost one indexed MIN() per
+    wake-up rather than a scan. `dispatch(platform, body, image_url, extra_image_urls)` must
+    return the post id, or None / raise on failure. Transient failures (see http_client.is_transient) are
+    retried with exponential backoff; any other failure is final.
+    """
+
+    def __init__(self, outbox: Outbox, dispatch, workers: int = OUTBOX_WORKERS,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, retry_base: float = 60.0):
+        self.outbox = outbox
+        self.dispatch = dispatch
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _run_job(self, job):
+        try:
+            post_id = self.dispatch(job["platform"], job["body"], job["image_url"], job["extra_image_urls"])
+            if not post_id:
+                raise RuntimeError("no post id returned")
+            self.outbox.complete(job["id"], post_id)
+            print(f"✅ Outbox job {job['id']} ({job['platform']}) posted: {post_id}")
+        except Exception as e:
+            # A retry could post twice unless the call provably did nothing
+            if not is_transient(e) or job["attempts"] >= self.max_attempts:
+                self.outbox.fail(job["id"], str(e))
+                print(f"❌ Outbox job {job['id']} ({job['platform']}) failed permanently: {e}")
+            else:
+                retry_at = time.time() + self.retry_base * 2 ** (job["attempts"] - 1)
+                self.outbox.fail(job["id"], str(e), retry_at=retry_at)
+                print(f"⚠️ Outbox job {job['id']} ({job['platform']}) failed, retrying later: {e}")
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            with self.outbox.changed:
+                self.outbox.changed.notify_all()
+
+    def run(self, until_idle: bool = False):
+        """Run the scheduler loop until stop() is called, or with until_idle=True until no
+        pending or running jobs remain."""
+        last_recovery = 0.0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox") as pool:
+            while not self._stopped.is_set():
+                # Checked on every idle period too, so a job abandoned after this started is not stuck
+                if time.monotonic() - last_recovery >= OUTBOX_MAX_IDLE:
+                    last_recovery = time.monotonic()
+                    recovered = self.outbox.recover()
+                    if recovered:
+                        print(f"♻️ Recovered {recovered} interrupted outbox job(s)")
+                with self._in_flight_lock:
+                    free = self.workers - self._in_flight
+                jobs = self.outbox.claim_due(time.time(), free) if free > 0 else []
+                for job in jobs:
+                    with self._in_flight_lock:
+                        self._in_flight += 1
+                    pool.submit(self._run_job, job)
+                if jobs:
+                    continue
+
+                next_run_at = self.outbox.next_run_at()
+                with self._in_flight_lock:
+                    busy = self._in_flight > 0
+                if until_idle and next_run_at is None and not busy:
+                    break
+                timeout = OUTBOX_MAX_IDLE if next_run_at is None else max(0.0, next_run_at - time.time())
+                with self.outbox.changed:
+                    self.outbox.changed.wait(min(timeout, OUTBOX_MAX_IDLE))
+
+    def stop(self):
+        self._stopped.set()
+        with self.outbox.changed:
+            self.outbox.changed.notify_all()
@@ -0,0 +1,16 @@
+import os
+import sqlite3
+
+# content-agent-langgraph/, so every run shares one cache whichever directory it starts from
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.getenv("CONTENT_AGENT_CACHE_DIR", os.path.join(PROJECT_DIR, ".cache"))
+
+
+def open_sqlite(path: str, **kwargs) -> sqlite3.Connection:
+    """Open (creating its directory) a SQLite file shared by the threads of one store, in WAL
+    mode so readers and the single writer do not block each other."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Pipeline:
+    """Runs stages as a dependency graph: each stage starts on a worker thread as soon as the
+    stages it depends on have finished, and receives their results as arguments.
+
+    Timings are recorded per stage so a run can report its critical path: the chain of
+    stages that actually determined the end-to-end latency.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+        self._futures = {}
+        self._deps = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def _record(self, name, start, end):
+        with self._lock:
+            self._timings[name] = (start, end)
+
+    def add(self, name: str, fn, deps=()):
+        """Schedule `fn(*results of deps)` to run once every stage in `deps` has finished."""
+        dep_futures = [self._futures[dep] for dep in deps]
+
+        def run():
+            args = [future.result() for future in dep_futures]
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(name, start, time.perf_counter())
+
+        self._deps[name] = list(deps)
+        self._futures[name] = self._executor.submit(run)
+        return self._futures[name]
+
+    def run_inline(self, name: str, fn, *args):
+        """Run a stage on the calling thread (e.g. one that prompts the user) and time it."""
+        future = Future()
+        self._futures[name] = future
+        self._deps[name] = []
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._record(name, start, time.perf_counter())
+        future.set_result(result)
+        return result
+
+    def result(self, name: str):
+        return self._futures[name].result()
+
+    def critical_path(self):
+        """[(stage, seconds)] along the chain that ended last, and the end-to-end latency."""
+        with self._lock:
+            timings = dict(self._timings)
+        if not timings:
+            return [], 0.0
+        name = max(timings, key=lambda n: timings[n][1])
+        total = timings[name][1] - self.started
+        path = []
+        while name:
+            start, end = timings[name]
+            path.append((name, end - start))
+            finished = [dep for dep in self._deps.get(name, []) if dep in timings]
+            name = max(finished, key=lambda d: timings[d][1]) if finished else None
+        return list(reversed(path)), total
+
+    def report(self):
+        path, total = self.critical_path()
+        with self._lock:
+            timings = dict(self._timings)
+        for name, (start, end) in sorted(timings.items(), key=lambda item: item[1][0]):
+            print(f"   {name:<12} {start - self.started:6.2f}s → {end - self.started:6.2f}s ({end - start:.2f}s)")
+        chain = " → ".join(f"{name} {seconds:.2f}s" for name, seconds in path)
+        print(f"⏱️ Critical path {total:.2f}s: {chain}")
+        return path, total
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
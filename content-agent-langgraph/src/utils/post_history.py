@@ -0,0 +1,141 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+from utils.paths import CACHE_DIR, open_sqlite
+
+POST_HISTORY_PATH = os.getenv("POST_HISTORY_PATH", os.path.join(CACHE_DIR, "post_history.db"))
+# Only posts this recent count when checking a draft
+POST_HISTORY_DAYS = float(os.getenv("POST_HISTORY_DAYS", "90"))
+# Estimated Jaccard similarity (of word 3-shingles) at which a draft repeats an earlier post
+POST_SIMILARITY_THRESHOLD = float(os.getenv("POST_SIMILARITY_THRESHOLD", "0.5"))
+
+# 32 bands of 4 rows: posts sharing any band are compared, which catches pairs down to
+# about 0.42 similarity with few false candidates
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+_permutations = None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", re.sub(r"https?://\S+", " ", text.lower()))
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def minhash(text: str):
+    """MinHash signature of `text`: MINHASH_PERMUTATIONS values, one per seeded multiply-shift
+    hash of its word 3-shingles. The seed is fixed, so signatures stored by earlier runs
+    stay comparable."""
+    # Imported here: numpy is only needed once a post is checked or recorded
+    import numpy as np
+    global _permutations
+    if _permutations is None:
+        rng = np.random.default_rng(1)
+        top = np.iinfo(np.uint64).max
+        _permutations = (rng.integers(0, top, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=True) | np.uint64(1),
+                         rng.integers(0, top, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=True))
+    a, b = _permutations
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+                       for shingle in _shingles(text))
+    hashes = np.frombuffer(digests, dtype=np.uint32).astype(np.uint64)
+    # (a * x + b) mod 2**64, keeping the well-mixed high 32 bits
+    return ((np.outer(hashes, a) + b) >> np.uint64(32)).min(axis=0)
+
+
+def _band_keys(signature) -> list:
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(),
+                                           digest_size=8).digest(), "big", signed=True)
+            for band in range(LSH_BANDS)]
+
+
+class SimilarPost:
+    __slots__ = ("platform", "text", "topic", "posted_at", "similarity")
+
+    def __init__(self, platform, text, topic, posted_at, similarity):
+        self.platform = platform
+        self.text = text
+        self.topic = topic
+        self.posted_at = posted_at
+        self.similarity = similarity
+
+    def __str__(self):
+        return (f"{self.similarity:.0%} similar to the {self.platform} post of "
+                f"{time.strftime('%Y-%m-%d', time.gmtime(self.posted_at))}")
+
+
+class DuplicatePostError(Exception):
+    """Every draft for a topic repeated a recent post."""
+
+    def __init__(self, similar: SimilarPost, regenerations: int):
+        super().__init__(f"draft is still {similar} after {regenerations} regeneration(s)")
+        self.similar = similar
+
+
+class PostHistory:
+    """Every published (or scheduled) post per platform, with a MinHash LSH index over them.
+
+    `find_similar(text)` looks a draft up by its LSH band keys, so it compares against the
+    handful of candidate posts rather than the whole history and takes milliseconds.
+    """
+
+    def __init__(self, path: str = POST_HISTORY_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                platform TEXT NOT NULL,
+                text TEXT NOT NULL,
+                topic TEXT,
+                posted_at REAL NOT NULL,
+                signature BLOB NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS posts_topic ON posts (topic, posted_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bands (key INTEGER NOT NULL, post_id INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (key)")
+        self._conn.commit()
+
+    def record(self, platform: str, text: str, topic: str = None, posted_at: float = None):
+        signature = minhash(text)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO posts (platform, text, topic, posted_at, signature) VALUES (?, ?, ?, ?, ?)",
+                (platform, text, _normalize_topic(topic), posted_at or time.time(), signature.tobytes()))
+            self._conn.executemany("INSERT INTO bands (key, post_id) VALUES (?, ?)",
+                                   [(key, cursor.lastrowid) for key in _band_keys(signature)])
+            self._conn.commit()
+
+    def find_similar(self, text: str, threshold: float = POST_SIMILARITY_THRESHOLD, days: float = POST_HISTORY_DAYS):
+        """The recent post most similar to `text`, if any reaches `threshold`, else None."""
+        import numpy as np
+        signature = minhash(text)
+        keys = _band_keys(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT p.platform, p.text, p.topic, p.posted_at, p.signature FROM bands b "
+                f"JOIN posts p ON p.id = b.post_id WHERE b.key IN ({','.join('?' * len(keys))}) AND p.posted_at >= ?",
+                (*keys, time.time() - days * 86400)).fetchall()
+        best = None
+        for platform, post_text, topic, posted_at, stored in rows:
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint64) == signature))
+            if similarity >= threshold and (best is None or similarity > best.similarity):
+                best = SimilarPost(platform, post_text, topic, posted_at, similarity)
+        return best
+
+    def posted_about(self, topic: str, days: float = POST_HISTORY_DAYS) -> bool:
+        """Whether a recent post was made for this topic (compared case- and space-insensitively)."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM posts WHERE topic = ? AND posted_at >= ? LIMIT 1",
+                                     (_normalize_topic(topic), time.time() - days * 86400)).fetchone()
+        return row is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+
+def _normalize_topic(topic: str):
+    return " ".join(topic.lower().split()) if topic else None
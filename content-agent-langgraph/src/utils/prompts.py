@@ -0,0 +1,58 @@
+import re
+
+# Instructions, then the context, then the topic. At ~500 tokens these prompts are below the
+# provider's 1024-token prompt-cache minimum, so none of it is served from the cache
+CAPTION_PROMPT = """
+You are a B2B tech content strategist. Based on the contextual content below and the topic at the end, write:
+
+1. A professional LinkedIn **caption** (max 250 characters) designed to spark interest.
+2. A concise and informative **LinkedIn post body** (80–150 words) written in simple, authoritative tone.
+
+Format:
+CAPTION: <caption here>
+CONTENT: <content here>
+
+Context from website content:
+{context}
+
+Topic: {topic}
+"""
+
+DIVERSITY_HINT = """
+This was already posted recently, so do not repeat it. Take a different angle, hook and wording:
+
+{previous}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return len(text) // 4 + 1
+
+
+def format_context(docs) -> str:
+    return "\n\n".join([f"{i+1}. {doc.page_content}" for i, doc in enumerate(docs)])
+
+
+def build_caption_prompt(topic: str, context: str, avoid: str = None) -> str:
+    """`avoid` is an earlier post the new one must not repeat."""
+    prompt = CAPTION_PROMPT.format(topic=topic, context=context)
+    return prompt + DIVERSITY_HINT.format(previous=avoid) if avoid else prompt
+
+
+# Section markers, tolerant of case, markdown bold and spacing drift ("**Caption:**", "content :")
+CAPTION_MARKER = re.compile(r"\*{0,2}\s*caption\s*\*{0,2}\s*:\s*\*{0,2}", re.IGNORECASE)
+CONTENT_MARKER = re.compile(r"\*{0,2}\s*content\s*\*{0,2}\s*:\s*\*{0,2}", re.IGNORECASE)
+
+
+def parse_caption_output(output: str):
+    """Split a completion into (caption, content)."""
+    caption_match = CAPTION_MARKER.search(output)
+    content_match = CONTENT_MARKER.search(output, caption_match.end() if caption_match else 0)
+    if caption_match and content_match:
+        caption = output[caption_match.end():content_match.start()].strip().strip("*").strip()
+        content = output[content_match.end():].strip()
+    else:
+        caption = "⚠️ Could not parse caption"
+        content = output.strip()
+    return caption, content
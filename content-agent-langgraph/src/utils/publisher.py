@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.http_client import is_transient
+from utils.models import PostResult
+from utils.telemetry import span
+from utils.image_store import get_image_store
+from utils.social_media import (post_to_facebook, post_to_instagram, post_to_twitter, post_to_linkedin,
+                                finish_instagram, start_facebook_and_instagram)
+
+ALL_PLATFORMS = ["facebook", "instagram", "twitter", "linkedin"]
+
+
+def post_to(platform: str, post_body: str, image_url: str = None, extra_image_urls: list = None):
+    """Post to a single platform. Returns the platform's post id; raises on failure.
+    `extra_image_urls` turn an Instagram post into a carousel; other platforms ignore them."""
+    if platform == "facebook":
+        return post_to_facebook(post_body, image_url)
+    if platform == "instagram":
+        return post_to_instagram(post_body, image_url, extra_image_urls)
+    if platform == "twitter":
+        return post_to_twitter(post_body)
+    if platform == "linkedin":
+        return post_to_linkedin(post_body, image_url)
+    raise ValueError(f"Unknown platform: {platform}")
+
+
+def _timed(platform: str, post, *args, **kwargs):
+    started = time.perf_counter()
+    with span("publish", platform=platform) as s:
+        transient = False
+        try:
+            post_id = post(*args, **kwargs)
+            status, error = ("success", None) if post_id else ("failed", "no post id returned")
+        except Exception as e:
+            post_id, status, error, transient = None, "failed", str(e), is_transient(e)
+        s.set(status=status, post_id=post_id, error=error)
+    return PostResult(post_id, platform, status, latency=time.perf_counter() - started, error=error,
+                      transient=transient)
+
+
+def _raise_if_error(value):
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
+def _post_facebook_and_instagram(facebook_body: str, instagram_body: str, image_url: str,
+                                 extra_image_urls: list = None) -> list:
+    """Facebook and Instagram from one Graph batch request: Facebook's result is known once it
+    returns, Instagram's once its containers are published."""
+    containers = []
+
+    def start():
+        try:
+            facebook, container = start_facebook_and_instagram(facebook_body, instagram_body, image_url,
+                                                               extra_image_urls)
+        except Exception as e:
+            facebook = container = e
+        containers.append(container)
+        return _raise_if_error(facebook)
+
+    facebook = _timed("facebook", start)
+    instagram = _timed("instagram", lambda: finish_instagram(instagram_body, _raise_if_error(containers[0])))
+    instagram.latency += facebook.latency
+    return [facebook, instagram]
+
+
+def publish(post_body: str, image_url: str, platforms: list, bodies: dict = None, extra_image_urls: list = None):
+    """Post to every selected platform concurrently and return one PostResult per platform.
+
+    `bodies` gives per-platform text (e.g. a tweet-length variant); platforms without an
+    entry get `post_body`. With `extra_image_urls` the Instagram post is a carousel of
+    image_url and those; its item containers are created in parallel.
+
+    The image is downloaded once into the local image store; the uploaders that need the
+    bytes (Facebook, LinkedIn) each stream their own rendition of it from disk, and
+    Instagram is given a URL, which Graph fetches itself. When both Facebook and Instagram
+    are selected, Facebook is given the URL too, so its photo and the Instagram container
+    are created in one Graph batch request.
+    """
+    platforms = [p for p in ALL_PLATFORMS if p in platforms]
+    if "instagram" in platforms and not image_url:
+        print("Instagram post requires an image. Skipping.")
+        platforms.remove("instagram")
+    paired = "facebook" in platforms and "instagram" in platforms
+    if image_url and (("facebook" in platforms and not paired) or "linkedin" in platforms):
+        try:
+            get_image_store().fetch(image_url)
+        except Exception as e:
+            print("❌ Image download failed:", e)
+
+    if not platforms:
+        return []
+
+    def body(platform):
+        return (bodies or {}).get(platform) or post_body
+
+    with ThreadPoolExecutor(max_workers=len(platforms)) as pool:
+        futures = [pool.submit(_post_facebook_and_instagram, body("facebook"), body("instagram"), image_url,
+                               extra_image_urls)] if paired else []
+        futures += [pool.submit(lambda platform: [_timed(platform, post_to, platform, body(platform), image_url,
+                                                         extra_image_urls)], platform)
+                    for platform in platforms if not (paired and platform in ("facebook", "instagram"))]
+        results = sorted((result for future in futures for result in future.result()),
+                         key=lambda result: ALL_PLATFORMS.index(result.platform))
+    for result in results:
+        mark = "✅" if result.status == "success" else "❌"
+        detail = result.post_id if result.status == "success" else result.error
+        print(f"{mark} {result.platform:<10} {result.latency * 1000:7.0f} ms  {detail}")
+    return results
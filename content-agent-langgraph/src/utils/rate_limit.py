@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`, holding at most `capacity`.
+
+    Callers reserve tokens up front and the bucket may go into debt; each caller then waits
+    until its reservation is covered. That keeps callers in FIFO order and makes the same
+    bucket usable from threads (`acquire`) and from asyncio (`acquire_async`).
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return how long to wait before they are available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self, amount: float = 1):
+        wait = self._reserve(amount)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: float = 1):
+        wait = self._reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Shared requests-per-minute and tokens-per-minute budget for an API."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    async def acquire_async(self, tokens: int):
+        await self.requests.acquire_async(1)
+        await self.tokens.acquire_async(tokens)
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+
+import faiss
+import numpy as np
+
+from utils.embedding_cache import CachedEmbedder
+from utils.paths import CACHE_DIR
+from utils.telemetry import record_usage, span
+
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(CACHE_DIR, "index"))
+EMBEDDER = os.getenv("EMBEDDER", "openai")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+
+_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+
+class Chunk:
+    def __init__(self, page_content: str, metadata: dict):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def _split(text: str, chunk_size: int, separators: list):
+    """Recursively split on the coarsest separator that yields pieces under chunk_size."""
+    if len(text) <= chunk_size:
+        return [text]
+    if not separators:
+        return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    sep, rest = separators[0], separators[1:]
+    pieces = []
+    for part in text.split(sep):
+        if len(part) > chunk_size:
+            pieces.extend(_split(part, chunk_size, rest))
+        elif part:
+            pieces.append(part)
+    return pieces if len(pieces) > 1 else _split(text, chunk_size, rest)
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """Pack split pieces into chunks of at most chunk_size characters, carrying a tail of
+    the previous chunk forward as overlap."""
+    chunks = []
+    current = ""
+    for piece in _split(text.strip(), chunk_size, _SEPARATORS):
+        if current and len(current) + len(piece) + 1 > chunk_size:
+            chunks.append(current)
+            # Start the overlap on a word boundary
+            current = current[-chunk_overlap:].partition(" ")[2] if chunk_overlap else ""
+        current = f"{current} {piece}".strip() if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class HashingEmbedder:
+    """Deterministic, offline embedder: signed feature hashing of word unigrams and bigrams."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, token: str):
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return h % self.dim, 1.0 if (h >> 63) & 1 else -1.0
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                col, sign = self._bucket(token)
+                vectors[row, col] += sign
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = "text-embedding-3-small", batch_size: int = 100):
+        self.model = model
+        self.name = model
+        self.batch_size = batch_size
+
+    def embed(self, texts: list) -> np.ndarray:
+        # Imported here: the SDK is slow to load and the hashing embedder never needs it
+        import openai
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            response = openai.embeddings.create(model=self.model, input=texts[i:i + self.batch_size])
+            if response.usage:
+                record_usage(self.model, response.usage.prompt_tokens, 0)
+            vectors.extend(item.embedding for item in response.data)
+        vectors = np.asarray(vectors, dtype="float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+def get_embedder(name: str = EMBEDDER):
+    if name == "hashing":
+        return HashingEmbedder()
+    return OpenAIEmbedder() if name == "openai" else OpenAIEmbedder(model=name)
+
+
+def corpus_fingerprint(docs, embedder_name: str) -> str:
+    digest = hashlib.sha256(embedder_name.encode("utf-8"))
+    for doc in docs:
+        digest.update(doc.metadata["source"].encode("utf-8"))
+        digest.update(hashlib.sha256(doc.page_content.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class VectorIndex:
+    """Cosine-similarity FAISS index over page chunks, persisted as index.faiss + chunks.json.
+
+    Vectors live in an IndexIDMap2 keyed by a stable chunk id, so `sync` can add the chunks
+    of new or changed pages and remove those of changed or vanished pages without touching
+    the rest of the index.
+    """
+
+    def __init__(self, embedder, index=None, chunks=None, fingerprint=None, next_id=0):
+        self.embedder = embedder
+        self.index = index
+        self.chunks = chunks or {}
+        self.fingerprint = fingerprint
+        self.next_id = next_id
+
+    @classmethod
+    def build(cls, docs, embedder):
+        index = cls(embedder)
+        index.sync(docs)
+        return index
+
+    def sync(self, docs) -> bool:
+        """Bring the index in line with `docs`, embedding only chunks it does not already hold.
+        Returns True if anything changed."""
+        fingerprint = corpus_fingerprint(docs, self.embedder.name)
+        if fingerprint == self.fingerprint:
+            return False
+        wanted = {}
+        for doc in docs:
+            for text in chunk_text(doc.page_content):
+                key = (doc.metadata["source"], hashlib.sha256(text.encode("utf-8")).hexdigest())
+                wanted.setdefault(key, text)
+
+        existing = {(c["source"], c["hash"]): chunk_id for chunk_id, c in self.chunks.items()}
+        stale = [chunk_id for key, chunk_id in existing.items() if key not in wanted]
+        fresh = [(key, text) for key, text in wanted.items() if key not in existing]
+
+        if stale:
+            self.index.remove_ids(np.asarray(stale, dtype="int64"))
+            for chunk_id in stale:
+                del self.chunks[chunk_id]
+        if fresh:
+            vectors = self.embedder.embed([text for _, text in fresh])
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+            ids = np.arange(self.next_id, self.next_id + len(fresh), dtype="int64")
+            self.index.add_with_ids(vectors, ids)
+            for chunk_id, ((source, digest), text) in zip(ids.tolist(), fresh):
+                self.chunks[chunk_id] = {"text": text, "source": source, "hash": digest}
+            self.next_id += len(fresh)
+
+        self.fingerprint = fingerprint
+        print(f"📚 Index sync: +{len(fresh)} / -{len(stale)} chunks ({len(self.chunks)} total)")
+        return True
+
+    def save(self, index_dir: str = INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        # Written beside the old files and renamed over them: a previously loaded index may
+        # still have index.faiss memory-mapped, and truncating it in place would crash it
+        if self.index is not None:
+            faiss.write_index(self.index, os.path.join(index_dir, "index.faiss.tmp"))
+            os.replace(os.path.join(index_dir, "index.faiss.tmp"), os.path.join(index_dir, "index.faiss"))
+        meta = {
+            "fingerprint": self.fingerprint,
+            "embedder": self.embedder.name,
+            "next_id": self.next_id,
+            "chunks": self.chunks,
+        }
+        with open(os.path.join(index_dir, "chunks.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(index_dir, "chunks.json.tmp"), os.path.join(index_dir, "chunks.json"))
+
+    @classmethod
+    def load(cls, embedder, index_dir: str = INDEX_DIR):
+        """Load a saved index with its vectors memory-mapped rather than read into RAM."""
+        with open(os.path.join(index_dir, "chunks.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("embedder") != embedder.name:
+            raise ValueError(f"index was built with {meta.get('embedder')}, not {embedder.name}")
+        chunks = {int(chunk_id): chunk for chunk_id, chunk in meta["chunks"].items()}
+        index = None
+        if chunks:
+            index = faiss.read_index(os.path.join(index_dir, "index.faiss"), faiss.IO_FLAG_MMAP)
+        return cls(embedder, index, chunks, meta["fingerprint"], meta["next_id"])
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K):
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: list, k: int = RETRIEVAL_TOP_K) -> list:
+        """The top k chunks for each query; the queries are embedded in one call."""
+        if not self.chunks or not queries:
+            return [[] for _ in queries]
+        with span("retrieve", k=k, queries=len(queries)):
+            scores, ids = self.index.search(self.embedder.embed(list(queries)), min(k, len(self.chunks)))
+        return [
+            [Chunk(self.chunks[i]["text"], {"source": self.chunks[i]["source"], "score": float(score)})
+             for score, i in zip(row_scores, row_ids.tolist()) if i >= 0]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+
+def build_or_load_index(docs, embedder=None, index_dir: str = INDEX_DIR) -> VectorIndex:
+    """Load the on-disk index and incrementally sync it with `docs`, or build it from scratch."""
+    embedder = embedder or CachedEmbedder(get_embedder())
+    index = None
+    if os.path.exists(os.path.join(index_dir, "chunks.json")):
+        try:
+            index = VectorIndex.load(embedder, index_dir)
+        except Exception as e:
+            print(f"Could not load vector index, rebuilding: {e}")
+    if index is None:
+        index = VectorIndex.build(docs, embedder)
+        index.save(index_dir)
+    elif index.sync(docs):
+        index.save(index_dir)
+    print(f"📚 Vector index ready ({len(index.chunks)} chunks)")
+    return index
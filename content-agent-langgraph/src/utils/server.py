@@ -0,0 +1,296 @@
+"""Long-running HTTP API around one warm LangGraphAgent.
+
+    POST /generate        {"topic": ..., "regenerate": false}            → {"caption", "content", "latency"}
+                                                                         (409 if every draft repeats a recent post)
+                          {"topic": ..., "platforms": [...], "n": 1}    → {"variants": {platform: text}, "latency"}
+    POST /generate-image  {"prompt": ..., "regenerate": false}           → {"image_url", "latency"}
+    POST /publish         {"caption", "content", "image_url", "platforms", "variants", "topic", "extra_image_urls"}
+                                                                         → {"results": [...]}
+    POST /schedule        {"caption", "image_url", "platforms", "time": "YYYY-MM-DD HH:MM" (GST), "topic",
+                           "extra_image_urls"}
+    GET  /health
+    GET  /metrics                                                         → Prometheus text format
+
+The corpus and index, the OpenAI client, the platform sessions and the outbox scheduler
+live for the life of the process, so a request costs only its own generation or posting.
+"""
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytz
+
+from utils import telemetry
+from utils.outbox import OutboxScheduler
+from utils.post_history import DuplicatePostError
+from utils.publisher import ALL_PLATFORMS, post_to
+from utils.social_media import convert_gst_to_utc
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+# Requests in flight per route group; more than that wait up to SERVER_QUEUE_TIMEOUT, then get a 503
+SERVER_MAX_GENERATIONS = int(os.getenv("SERVER_MAX_GENERATIONS", "4"))
+SERVER_MAX_IMAGES = int(os.getenv("SERVER_MAX_IMAGES", "2"))
+SERVER_MAX_PUBLISHES = int(os.getenv("SERVER_MAX_PUBLISHES", "2"))
+SERVER_QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "5"))
+CORPUS_REFRESH_INTERVAL = float(os.getenv("CORPUS_REFRESH_INTERVAL", "3600"))
+MAX_BODY_BYTES = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AgentService:
+    """The warm state behind the API: one agent, its corpus refresher and the outbox scheduler."""
+
+    def __init__(self, agent, refresh_interval: float = CORPUS_REFRESH_INTERVAL, run_scheduler: bool = True):
+        self.agent = agent
+        self.refresh_interval = refresh_interval
+        self.ready = threading.Event()
+        self.last_refresh = None
+        self.limits = {
+            "generate": threading.BoundedSemaphore(SERVER_MAX_GENERATIONS),
+            "image": threading.BoundedSemaphore(SERVER_MAX_IMAGES),
+            "publish": threading.BoundedSemaphore(SERVER_MAX_PUBLISHES),
+        }
+        self.in_flight = {name: 0 for name in self.limits}
+        self.rejected = 0
+        self._counter_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.scheduler = OutboxScheduler(agent.outbox, post_to)
+        self._threads = [threading.Thread(target=self._refresh_loop, name="corpus-refresh", daemon=True)]
+        if run_scheduler:
+            self._threads.append(threading.Thread(target=self.scheduler.run, name="outbox", daemon=True))
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.scheduler.stop()
+
+    def _refresh_loop(self):
+        # The first load happens here too, so the API is listening while the corpus loads
+        while True:
+            try:
+                started = time.perf_counter()
+                self.agent.load_corpus()
+                self.last_refresh = time.time()
+                self.ready.set()
+                print(f"🔄 Corpus refreshed in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                print(f"❌ Corpus refresh failed: {e}")
+            if self._stopped.wait(self.refresh_interval):
+                return
+
+    @contextmanager
+    def slot(self, name: str):
+        """Take a concurrency slot, or raise 503 if none frees up within the queue timeout."""
+        if not self.limits[name].acquire(timeout=SERVER_QUEUE_TIMEOUT):
+            with self._counter_lock:
+                self.rejected += 1
+            raise HTTPError(503, f"too many {name} requests in flight", retry_after=1)
+        with self._counter_lock:
+            self.in_flight[name] += 1
+        try:
+            yield
+        finally:
+            with self._counter_lock:
+                self.in_flight[name] -= 1
+            self.limits[name].release()
+
+    def generate(self, body: dict) -> dict:
+        topic = _required(body, "topic")
+        if not self.ready.wait(SERVER_QUEUE_TIMEOUT):
+            raise HTTPError(503, "corpus is still loading", retry_after=5)
+        with self.slot("generate"):
+            started = time.perf_counter()
+            if body.get("platforms"):
+                # Per-platform copy from one structured call
+                variants = self.agent.generate_variants(topic, _platforms(body), n=_positive_int(body, "n", 1),
+                                                        force=bool(body.get("regenerate")))
+                return {"variants": variants, "latency": time.perf_counter() - started}
+            try:
+                caption, content = self.agent.generate_post(topic, force=bool(body.get("regenerate")))
+            except DuplicatePostError as e:
+                raise HTTPError(409, str(e))
+        return {"caption": caption, "content": content, "latency": time.perf_counter() - started}
+
+    def generate_image(self, body: dict) -> dict:
+        prompt = _required(body, "prompt")
+        with self.slot("image"):
+            started = time.perf_counter()
+            image_url = self.agent.generate_image(prompt, force=bool(body.get("regenerate")))
+        if not image_url:
+            raise HTTPError(502, "image generation failed")
+        return {"image_url": image_url, "latency": time.perf_counter() - started}
+
+    def publish(self, body: dict) -> dict:
+        variants, platforms = body.get("variants") or {}, _platforms(body)
+        caption = body.get("caption", "")
+        if not caption and any(platform not in variants for platform in platforms):
+            raise HTTPError(400, "'caption' is required for platforms without a variant")
+        with self.slot("publish"):
+            results = self.agent.post_to_platforms(caption, body.get("content", ""), body.get("image_url"), platforms,
+                                                   variants=variants, topic=body.get("topic"),
+                                                   extra_image_urls=body.get("extra_image_urls"))
+        return {"results": [vars(result) for result in results]}
+
+    def schedule(self, body: dict) -> dict:
+        caption, platforms = _required(body, "caption"), _platforms(body)
+        try:
+            scheduled_time_utc = convert_gst_to_utc(_required(body, "time"))
+        except ValueError:
+            raise HTTPError(400, "time must be 'YYYY-MM-DD HH:MM' (GST)")
+        if scheduled_time_utc <= datetime.now(pytz.utc):
+            raise HTTPError(400, "time must be in the future")
+        self.agent.schedule_post(caption, body.get("image_url"), platforms, scheduled_time_utc, topic=body.get("topic"),
+                                 extra_image_urls=body.get("extra_image_urls"))
+        return {"scheduled_for": scheduled_time_utc.isoformat(), "platforms": platforms}
+
+    def health(self) -> dict:
+        with self._counter_lock:
+            in_flight, rejected = dict(self.in_flight), self.rejected
+        return {
+            "ready": self.ready.is_set(),
+            "pages": len(self.agent.retrieved_docs),
+            "last_refresh": self.last_refresh,
+            "in_flight": in_flight,
+            "rejected": rejected,
+            "outbox": self.agent.outbox.counts(),
+        }
+
+
+def _required(body: dict, field: str):
+    value = body.get(field)
+    if not value:
+        raise HTTPError(400, f"'{field}' is required")
+    return value
+
+
+def _positive_int(body: dict, field: str, default: int) -> int:
+    try:
+        value = int(body.get(field, default))
+    except (TypeError, ValueError):
+        value = 0
+    if value < 1:
+        raise HTTPError(400, f"'{field}' must be a positive integer")
+    return value
+
+
+def _platforms(body: dict) -> list:
+    platforms = body.get("platforms") or []
+    if isinstance(platforms, str):
+        platforms = [p.strip() for p in platforms.split(",") if p.strip()]
+    if "all" in platforms:
+        return list(ALL_PLATFORMS)
+    unknown = [p for p in platforms if p not in ALL_PLATFORMS]
+    if not platforms or unknown:
+        raise HTTPError(400, f"'platforms' must be a list of {', '.join(ALL_PLATFORMS)} or 'all'")
+    return platforms
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    service = None
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY each keep-alive
+    # response stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    routes = {
+        "/generate": AgentService.generate,
+        "/generate-image": AgentService.generate_image,
+        "/publish": AgentService.publish,
+        "/schedule": AgentService.schedule,
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, call):
+        started = time.perf_counter()
+        try:
+            with telemetry.span("request", route=self.path):
+                status, body = 200, call()
+        except HTTPError as e:
+            headers = {"Retry-After": str(int(e.retry_after))} if e.retry_after else None
+            self._send(e.status, {"error": str(e)}, headers)
+            status = e.status
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+            status = 500
+        else:
+            self._send(status, body)
+        print(f"🌐 {self.command} {self.path} → {status} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._handle(self.service.health)
+        if self.path == "/metrics":
+            data = telemetry.metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        route = self.routes.get(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": "request body too large"})
+        raw = self.rfile.read(length)
+        if route is None:
+            return self._send(404, {"error": "not found"})
+
+        def call():
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                raise HTTPError(400, "request body must be JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "request body must be a JSON object")
+            return route(self.service, body)
+
+        self._handle(call)
+
+
+def serve(agent, host: str = SERVER_HOST, port: int = SERVER_PORT, refresh_interval: float = CORPUS_REFRESH_INTERVAL):
+    """Run the API in the foreground until interrupted."""
+    # Loaded up front so the first request does not pay for the SDK import
+    importlib.import_module("openai")
+    service = AgentService(agent, refresh_interval)
+    handler = type("Handler", (AgentRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    service.start()
+    print(f"🚀 Serving on http://{host}:{server.server_address[1]} (corpus refresh every {refresh_interval:.0f}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
@@ -0,0 +1,108 @@
+import gzip
+import os
+from datetime import datetime, timezone
+from urllib.robotparser import RobotFileParser
+
+import lxml.etree
+
+from utils.urls import canonicalize
+
+SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "5000"))
+# Sitemap files fetched per crawl, counting nested sitemap indexes
+SITEMAP_MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", "10"))
+
+
+class SiteRules:
+    """A site's robots.txt: which URLs may be fetched, the requested crawl delay and its sitemaps."""
+
+    def __init__(self, robots_text: str = None, user_agent: str = "*", disallow_all: bool = False):
+        self.user_agent = user_agent
+        self._parser = RobotFileParser()
+        if disallow_all:
+            self._parser.disallow_all = True
+        elif robots_text is None:
+            self._parser.allow_all = True
+        else:
+            self._parser.parse(robots_text.splitlines())
+
+    @classmethod
+    def fetch(cls, session, site_url: str, user_agent: str, timeout: float):
+        """Fetch /robots.txt. A missing file allows everything; 401/403 disallow everything."""
+        try:
+            response = session.get(site_url.rstrip("/") + "/robots.txt", timeout=timeout)
+        except Exception as e:
+            print(f"Could not fetch robots.txt, crawling without it: {e}")
+            return cls(user_agent=user_agent)
+        if response.status_code in (401, 403):
+            return cls(user_agent=user_agent, disallow_all=True)
+        if response.status_code != 200:
+            return cls(user_agent=user_agent)
+        return cls(response.text, user_agent)
+
+    def allowed(self, url: str) -> bool:
+        return self._parser.can_fetch(self.user_agent, url)
+
+    @property
+    def crawl_delay(self) -> float:
+        delay = self._parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    @property
+    def sitemaps(self) -> list:
+        return self._parser.site_maps() or []
+
+
+def parse_lastmod(value: str):
+    """W3C datetime (a date, or a date and time with offset) → epoch seconds, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _children(element, name: str):
+    return [child for child in element if isinstance(child.tag, str) and lxml.etree.QName(child).localname == name]
+
+
+def _text(element, name: str):
+    found = _children(element, name)
+    return found[0].text.strip() if found and found[0].text else None
+
+
+def fetch_sitemap_urls(session, sitemap_urls: list, timeout: float, max_urls: int = SITEMAP_MAX_URLS):
+    """Collect [(url, lastmod epoch or None)] from sitemaps, following sitemap indexes. URLs are
+    kept as the sitemap lists them (only checked to be pages), so they can be fetched without
+    a redirect; callers canonicalize them for de-duplication."""
+    queue, seen, entries = list(sitemap_urls), set(), []
+    files = 0
+    while queue and files < SITEMAP_MAX_FILES and len(entries) < max_urls:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        files += 1
+        try:
+            response = session.get(sitemap_url, timeout=timeout)
+            if response.status_code != 200:
+                continue
+            data = response.content
+            if data[:2] == b"\x1f\x8b":
+                data = gzip.decompress(data)
+            root = lxml.etree.fromstring(data, parser=lxml.etree.XMLParser(resolve_entities=False, no_network=True))
+        except Exception as e:
+            print(f"Could not read sitemap {sitemap_url}: {e}")
+            continue
+        kind = lxml.etree.QName(root).localname
+        if kind == "sitemapindex":
+            queue.extend(loc for loc in (_text(entry, "loc") for entry in _children(root, "sitemap")) if loc)
+        elif kind == "urlset":
+            for entry in _children(root, "url"):
+                url = (_text(entry, "loc") or "").strip()
+                if canonicalize(url):
+                    entries.append((url, parse_lastmod(_text(entry, "lastmod"))))
+    return entries[:max_urls]
@@ -1,8 +1,9 @@
 import os
-import requests
-import tweepy
 from dotenv import load_dotenv
-import mimetypes
+import requests
+from utils.graph import GraphAPI, GraphError, instagram_items
+from utils.http_client import MultipartFile, PlatformClient
+from utils.image_store import get_image_store
 load_dotenv()
 # Load environment variables
 FACEBOOK_PAGE_TOKEN = os.getenv("FACEBOOK_PAGE_TOKEN")
@@ -14,88 +15,161 @@ TWITTER_ACCESS_SECRET = os.getenv("TWITTER_ACCESS_SECRET")
 LINKEDIN_ACCESS_TOKEN = os.getenv("LINKEDIN_ACCESS_TOKEN")
 COMPANY_URN = os.getenv("COMPANY_URN")
 FACEBOOK_PAGE_ID= os.getenv("FACEBOOK_PAGE_ID")
+# Overridable so the functions can be pointed at a local stub server
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.facebook.com/v19.0")
+LINKEDIN_API_BASE = os.getenv("LINKEDIN_API_BASE", "https://api.linkedin.com/v2")
+TWITTER_API_BASE = os.getenv("TWITTER_API_BASE", "https://api.twitter.com/1.1")
+
+# One pooled, retrying client per platform, shared by every call below
+graph_client = PlatformClient("graph", GRAPH_API_BASE)
+linkedin_client = PlatformClient("linkedin", LINKEDIN_API_BASE, headers={
+    "Authorization": f"Bearer {LINKEDIN_ACCESS_TOKEN}",
+    "X-Restli-Protocol-Version": "2.0.0",
+})
+twitter_client = PlatformClient("twitter", TWITTER_API_BASE)
+graph = GraphAPI(graph_client, FACEBOOK_PAGE_TOKEN)
 
 # Post to Facebook using Graph API
 def post_to_facebook(message: str, image_url: str = None):
+    """Returns the post id; raises on failure. The image comes from the local image store,
+    resized for Facebook and streamed from disk."""
     try:
         if image_url:
-            img_response = requests.get(image_url)
-            img_response.raise_for_status()
-            # Guess the content type from the URL or response headers
-            content_type = img_response.headers.get('Content-Type') or mimetypes.guess_type(image_url)[0] or 'image/jpeg'
-            files = {
-                'source': ('image.jpg', img_response.content, content_type)
-            }
-            payload = {
-                'caption': message,
-                'access_token': FACEBOOK_PAGE_TOKEN
-            }
-            res = requests.post(
-                f"https://graph.facebook.com/v19.0/{FACEBOOK_PAGE_ID}/photos",
-                data=payload,
-                files=files
-            )
+            path, content_type = get_image_store().rendition(image_url, "facebook")
+            body = MultipartFile({'caption': message, 'access_token': FACEBOOK_PAGE_TOKEN},
+                                 'source', path, content_type)
+            try:
+                res = graph_client.post(
+                    f"{FACEBOOK_PAGE_ID}/photos",
+                    data=body,
+                    headers={'Content-Type': body.content_type}
+                )
+            finally:
+                body.close()
         else:
             payload = {
                 'message': message,
                 'access_token': FACEBOOK_PAGE_TOKEN
             }
-            res = requests.post(
-                f"https://graph.facebook.com/v19.0/{FACEBOOK_PAGE_ID}/feed",
+            res = graph_client.post(
+                f"{FACEBOOK_PAGE_ID}/feed",
                 data=payload
             )
         res.raise_for_status()
         if not res.ok:
             print("Facebook error details:", res.text)
         print("✅ Facebook post successful!")
+        data = res.json()
+        return data.get("post_id") or data.get("id")
     except Exception as e:
         print("❌ Facebook post failed:", e)
         if hasattr(e, 'response') and e.response is not None:
             print("Response content:", e.response.text)
+        raise
 
 # Post to Instagram (must be image post)
-def post_to_instagram(caption: str, image_url: str):
-    graph_url = f"https://graph.facebook.com/v19.0/{INSTAGRAM_USER_ID}/media"
-    create_post_url = f"https://graph.facebook.com/v19.0/{INSTAGRAM_USER_ID}/media_publish"
-
-    payload = {
-        'image_url': image_url,
-        'caption': caption,
-        'access_token': FACEBOOK_PAGE_TOKEN
-    }
-    media_res = requests.post(graph_url, data=payload).json()
-    creation_id = media_res.get("id")
-    if creation_id:
-        publish_payload = {
-            'creation_id': creation_id,
-            'access_token': FACEBOOK_PAGE_TOKEN
-        }
-        publish_res = requests.post(create_post_url, data=publish_payload)
-        if publish_res.status_code == 200:
-            print("Posted to Instagram!")
-        else:
-            print("Instagram post failed:", publish_res.text)
+def post_to_instagram(caption: str, image_url: str, extra_image_urls: list = None):
+    """Returns the media id; raises on failure. With extra_image_urls the post is a
+    carousel. Each container is published only once Graph reports it FINISHED."""
+    # Graph fetches the images itself: the stored renditions if they are served publicly
+    try:
+        media_id = graph.publish_instagram(INSTAGRAM_USER_ID, caption, _instagram_urls(image_url, extra_image_urls))
+    except (GraphError, requests.RequestException) as e:
+        print("Instagram post failed:", e)
+        raise
+    print("Posted to Instagram!")
+    return media_id
+
+def _instagram_urls(image_url: str, extra_image_urls: list = None) -> list:
+    store = get_image_store()
+    return [store.public_url(url, "instagram") for url in [image_url, *(extra_image_urls or [])]]
+
+# Post the same image to Facebook and Instagram. The Facebook photo and the Instagram
+# containers do not depend on each other, so they go to Graph in one batch request.
+def start_facebook_and_instagram(facebook_message: str, instagram_caption: str, image_url: str,
+                                 extra_image_urls: list = None):
+    """Returns (Facebook post id, Instagram container ids), with a GraphError in place of
+    either that failed. Graph fetches the images for both, as it does for Instagram alone;
+    the containers still have to be published with finish_instagram."""
+    items = instagram_items(instagram_caption, _instagram_urls(image_url, extra_image_urls))
+    facebook, *containers = graph.batch(
+        [("POST", f"{FACEBOOK_PAGE_ID}/photos", {"url": get_image_store().public_url(image_url, "facebook"),
+                                                 "caption": facebook_message})]
+        + [("POST", f"{INSTAGRAM_USER_ID}/media", params) for params in items])
+    if isinstance(facebook, GraphError):
+        print("❌ Facebook post failed:", facebook)
     else:
-        print("Instagram media creation failed:", media_res)
-
-# Post to Twitter using tweepy
+        print("✅ Facebook post successful!")
+        facebook = facebook.get("post_id") or facebook["id"]
+    error = next((container for container in containers if isinstance(container, GraphError)), None)
+    if error is not None:
+        print("Instagram container creation failed:", error)
+        return facebook, error
+    return facebook, [container["id"] for container in containers]
+
+def finish_instagram(caption: str, container_ids: list):
+    """Returns the media id; raises on failure."""
+    try:
+        media_id = graph.finish_instagram(INSTAGRAM_USER_ID, caption, container_ids)
+    except (GraphError, requests.RequestException) as e:
+        print("Instagram post failed:", e)
+        raise
+    print("Posted to Instagram!")
+    return media_id
+
+# Post to Twitter; tweepy only signs the request (OAuth 1.0a), the pooled client sends it
 def post_to_twitter(message: str):
+    """Returns the tweet id; raises on failure."""
+    # Imported here so runs that never post to Twitter do not pay for tweepy
+    import tweepy
     try:
         auth = tweepy.OAuth1UserHandler(TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET)
-        api = tweepy.API(auth)
-        api.update_status(status=message)
+        res = twitter_client.post("statuses/update.json", data={"status": message}, auth=auth.apply_auth())
+        res.raise_for_status()
         print("Tweet posted successfully!")
-    except tweepy.TweepyException as e:
+        return res.json()["id_str"]
+    except Exception as e:
         print("Tweeting failed:", e)
+        if getattr(e, "response", None) is not None:
+            print("Response content:", e.response.text)
+        raise
 
 # Post to LinkedIn
-def post_to_linkedin(caption: str, image_url: str):
-    headers = {
-        "Authorization": f"Bearer {LINKEDIN_ACCESS_TOKEN}",
-        "X-Restli-Protocol-Version": "2.0.0",
-        "Content-Type": "application/json"
+def post_to_linkedin(caption: str, image_url: str = None):
+    """Returns the post URN; raises on failure. The image comes from the local image
+    store, resized for LinkedIn and streamed from disk; without one the post is text only."""
+    media = []
+    if image_url:
+        media = [{
+            "status": "READY",
+            "description": {"text": "Company post image"},
+            "media": _upload_linkedin_image(image_url),
+            "title": {"text": "Post Image"}
+        }]
+
+    # Create the company post
+    post_data = {
+        "author": COMPANY_URN,
+        "lifecycleState": "PUBLISHED",
+        "specificContent": {
+            "com.linkedin.ugc.ShareContent": {
+                "shareCommentary": {"text": caption},
+                "shareMediaCategory": "IMAGE" if media else "NONE",
+                "media": media
+            }
+        },
+        "visibility": {
+            "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
+        }
     }
 
+    post_response = linkedin_client.post("ugcPosts", json=post_data)
+    post_response.raise_for_status()
+    print("Posted to LinkedIn!")
+    return post_response.headers.get("x-restli-id") or post_response.json().get("id")
+
+def _upload_linkedin_image(image_url: str) -> str:
+    """Register an image upload, stream the LinkedIn rendition to it and return the asset URN."""
     # Step 1: Register the image for upload
     upload_request = {
         "registerUploadRequest": {
@@ -107,9 +181,8 @@ def post_to_linkedin(caption: str, image_url: str):
             }]
         }
     }
-    response = requests.post(
-        "https://api.linkedin.com/v2/assets?action=registerUpload",
-        headers=headers,
+    response = linkedin_client.post(
+        "assets?action=registerUpload",
         json=upload_request
     )
     response.raise_for_status()
@@ -118,38 +191,15 @@ def post_to_linkedin(caption: str, image_url: str):
     image_asset_urn = data["value"]["asset"]
 
     # Step 2: Upload the image
-    image_data = requests.get(image_url).content
+    path, _ = get_image_store().rendition(image_url, "linkedin")
     upload_headers = {
-        "Authorization": f"Bearer {LINKEDIN_ACCESS_TOKEN}",
         "Content-Type": "application/octet-stream"
     }
-    upload_response = requests.put(upload_url, headers=upload_headers, data=image_data)
+    with open(path, "rb") as image_file:
+        upload_response = linkedin_client.put(upload_url, headers=upload_headers, data=image_file)
     upload_response.raise_for_status()
+    return image_asset_urn
 
-    # Step 3: Create the company post
-    post_data = {
-        "author": COMPANY_URN,
-        "lifecycleState": "PUBLISHED",
-        "specificContent": {
-            "com.linkedin.ugc.ShareContent": {
-                "shareCommentary": {"text": caption},
-                "shareMediaCategory": "IMAGE",
-                "media": [{
-                    "status": "READY",
-                    "description": {"text": "Company post image"},
-                    "media": image_asset_urn,
-                    "title": {"text": "Post Image"}
-                }]
-            }
-        },
-        "visibility": {
-            "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-        }
-    }
-
-    post_response = requests.post("https://api.linkedin.com/v2/ugcPosts", headers=headers, json=post_data)
-    post_response.raise_for_status()
-    print("Posted to LinkedIn!")
 import datetime
 import pytz
 
@@ -159,56 +209,3 @@ def convert_gst_to_utc(gst_datetime_str):
     gst_time = datetime.datetime.strptime(gst_datetime_str, "%Y-%m-%d %H:%M")
     gst_time = gst.localize(gst_time)
     return gst_time.astimezone(pytz.utc)
-
-def create_instagram_container(image_url, caption):
-    url = f"https://graph.facebook.com/v19.0/{INSTAGRAM_USER_ID}/media"
-    payload = {
-        "image_url": image_url,
-        "caption": caption,
-        "access_token": FACEBOOK_PAGE_TOKEN
-    }
-    res = requests.post(url, data=payload)
-    data = res.json()
-    print("Instagram container response:", data)  # <-- Add this line
-    return data.get("id")
-
-def schedule_instagram_post(container_id, scheduled_time_utc):
-    url = f"https://graph.facebook.com/v19.0/{INSTAGRAM_USER_ID}/media_publish"
-    payload = {
-        "creation_id": container_id,
-        "access_token": FACEBOOK_PAGE_TOKEN,
-        "published": False,
-        "scheduled_publish_time": int(scheduled_time_utc.timestamp())
-    }
-    res = requests.post(url, data=payload)
-    print("Instagram scheduling response:", res.json())  # <-- Add this line
-    return res.json()
-
-def schedule_facebook_post(image_url, caption, scheduled_time_utc):
-    url = f"https://graph.facebook.com/v19.0/{FACEBOOK_PAGE_ID}/photos"
-    payload = {
-        "url": image_url,
-        "caption": caption,
-        "published": False,
-        "scheduled_publish_time": int(scheduled_time_utc.timestamp()),
-        "access_token": FACEBOOK_PAGE_TOKEN
-    }
-    res = requests.post(url, data=payload)
-    return res.json()
-
-def schedule_to_platforms(caption: str, image_url: str, platforms: list, scheduled_time_utc: datetime):
-    """Schedule posts to the given platforms."""
-    if "facebook" in platforms:
-        response = schedule_facebook_post(image_url, caption, scheduled_time_utc)
-        print("✅ Facebook post scheduled:", response)
-
-    if "instagram" in platforms:
-        container_id = create_instagram_container(image_url, caption)
-        response = schedule_instagram_post(container_id, scheduled_time_utc)
-        print("✅ Instagram post scheduled:", response)
-
-    if "twitter" in platforms:
-        print("⚠️ Twitter scheduling is not supported via API.")
-
-    if "linkedin" in platforms:
-        print("⚠️ LinkedIn scheduling is not supported via API.")
\ No newline at end of file
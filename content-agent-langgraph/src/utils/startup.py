@@ -0,0 +1,62 @@
+import os
+import re
+import subprocess
+import sys
+
+# What each stage imports on first use; agent.py itself defers everything below
+STAGE_MODULES = {
+    "cli": ["agent"],
+    "crawl": ["utils.crawler"],
+    "index": ["utils.retrieval"],
+    "generate": ["openai", "utils.batch"],
+    "twitter": ["tweepy"],
+}
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+MARKER = "@@stage "
+
+
+def profile_imports(stage_modules: dict = STAGE_MODULES):
+    """Import each stage's modules, in order, in a fresh interpreter run with -X importtime.
+
+    Returns ({stage: seconds}, {package: seconds}). Stage times are incremental: a module
+    already loaded by an earlier stage costs nothing again. Package times are the
+    cumulative cost of each top-level package the first time anything imported it.
+    """
+    statements = ["import sys"]
+    for stage, modules in stage_modules.items():
+        statements.append(f"sys.stderr.write({MARKER + stage!r} + '\\n')")
+        statements.extend(f"import {module}" for module in modules)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "; ".join(statements)],
+                            capture_output=True, text=True, env=env)
+
+    stages, packages, stage = {}, {}, None
+    for line in result.stderr.splitlines():
+        if line.startswith(MARKER):
+            stage = line[len(MARKER):]
+            stages[stage] = 0.0
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if not match or stage is None:
+            continue
+        cumulative, indent, name = int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)
+        if indent == 1:
+            stages[stage] += cumulative
+        package = name.split(".")[0]
+        # -X importtime prints children before their parent, so the last line wins
+        if "." not in name:
+            packages[package] = cumulative
+    if result.returncode != 0:
+        print(f"⚠️ Import profiling stopped early: {result.stderr.strip().splitlines()[-1]}")
+    return stages, packages
+
+
+def print_startup_profile(top: int = 8):
+    stages, packages = profile_imports()
+    print("⏱️ Import time by stage (cold interpreter, each stage on top of the previous ones):")
+    for stage, seconds in stages.items():
+        print(f"   {stage:<10} {seconds * 1000:8.0f} ms")
+    print("⏱️ Heaviest packages:")
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {package:<20} {seconds * 1000:8.0f} ms")
@@ -0,0 +1,62 @@
+import time
+
+from utils.prompts import CAPTION_MARKER, CONTENT_MARKER, parse_caption_output
+
+
+class CaptionStreamParser:
+    """Parses CAPTION/CONTENT sections out of a streamed completion as deltas arrive.
+
+    The caption is final as soon as the CONTENT marker appears, so `on_caption` fires then,
+    while the body is still streaming.
+    """
+
+    def __init__(self, on_caption=None):
+        self.on_caption = on_caption
+        self.buffer = ""
+        self.caption = None
+        self._caption_start = None
+
+    def feed(self, delta: str):
+        self.buffer += delta
+        if self.caption is not None:
+            return
+        if self._caption_start is None:
+            match = CAPTION_MARKER.search(self.buffer)
+            if not match:
+                return
+            self._caption_start = match.end()
+        # Markers can be split across deltas, so search the whole caption section each time
+        match = CONTENT_MARKER.search(self.buffer, self._caption_start)
+        if match:
+            self.caption = self.buffer[self._caption_start:match.start()].strip().strip("*").strip()
+            if self.on_caption:
+                self.on_caption(self.caption)
+
+    def result(self):
+        """(caption, content) for the full completion."""
+        return parse_caption_output(self.buffer)
+
+
+def stream_completion(stream, parser: CaptionStreamParser, started: float = None, echo: bool = True, on_usage=None):
+    """Consume a chat completion stream into `parser`, echoing tokens as they arrive.
+    Returns time-to-first-token in seconds since `started` (a time.perf_counter() taken
+    before the request was sent). `on_usage(usage)` receives the final usage chunk, sent
+    when the request asked for stream_options={"include_usage": True}."""
+    started = started if started is not None else time.perf_counter()
+    ttft = None
+    for chunk in stream:
+        if on_usage and getattr(chunk, "usage", None):
+            on_usage(chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        if not delta:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - started
+        if echo:
+            print(delta, end="", flush=True)
+        parser.feed(delta)
+    if echo:
+        print()
+    return ttft
@@ -0,0 +1,238 @@
+"""Timing spans, token/cost accounting and metrics export for every pipeline stage.
+
+Off by default. With CONTENT_AGENT_TELEMETRY=1 (or `enable()`), each span logs one JSON line
+to TELEMETRY_LOG (stderr if unset) and feeds Prometheus-style metrics, which are served at
+/metrics in service mode and written to METRICS_PATH at exit. While disabled, `span()` returns
+a shared no-op object and the recording functions return at their first line.
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from utils.paths import CACHE_DIR
+
+TELEMETRY_ENABLED = os.getenv("CONTENT_AGENT_TELEMETRY", "").lower() in ("1", "true", "yes")
+TELEMETRY_LOG = os.getenv("TELEMETRY_LOG")
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(CACHE_DIR, "metrics.prom"))
+
+# USD per million tokens (prompt, completion); MODEL_PRICES='{"model": [in, out]}' adds or overrides
+MODEL_PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+MODEL_PRICES.update({model: tuple(price) for model, price in json.loads(os.getenv("MODEL_PRICES", "{}")).items()})
+# USD per image
+IMAGE_PRICES = {("dall-e-3", "1024x1024"): 0.04, ("dall-e-3", "1024x1792"): 0.08, ("dall-e-3", "1792x1024"): 0.08,
+                ("dall-e-2", "1024x1024"): 0.02}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Span attributes that become metric labels; everything else (URLs, ids) stays in the logs only
+LABEL_KEYS = ("platform", "client", "model")
+
+_enabled = TELEMETRY_ENABLED
+_lock = threading.Lock()
+_log_path = TELEMETRY_LOG
+_log_file = None
+_span_ids = itertools.count(1)
+_current = contextvars.ContextVar("telemetry_span", default=None)
+_histograms = {}
+_counters = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(log_path: str = TELEMETRY_LOG):
+    """Turn telemetry on for the rest of the process."""
+    global _enabled, _log_path
+    with _lock:
+        _log_path = log_path or _log_path
+        _enabled = True
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "id", "parent", "started", "_token")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_span_ids)
+        self.parent = None
+        self.started = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent = parent.id if parent else None
+        self._token = _current.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        _current.reset(self._token)
+        labels = {"stage": self.name, **{k: str(self.attrs[k]) for k in LABEL_KEYS if k in self.attrs}}
+        _observe("content_agent_stage_duration_seconds", labels, duration)
+        record = {"ts": round(time.time(), 3), "span": self.name, "id": self.id, "parent": self.parent,
+                  "duration_ms": round(duration * 1000, 2), **self.attrs}
+        if exc_type is not None:
+            _increment("content_agent_stage_errors_total", labels)
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        log(record)
+        return False
+
+
+def span(name: str, **attrs):
+    """Time a stage: `with span("fetch", url=url) as s: ...; s.set(status=200)`."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def log(record: dict):
+    if not _enabled:
+        return
+    global _log_file
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        if _log_path and _log_file is None:
+            _log_file = open(_log_path, "a", encoding="utf-8")
+        (_log_file or sys.stderr).write(line)
+        if _log_file:
+            _log_file.flush()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def _increment(name: str, labels: dict, value: float = 1.0):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def _observe(name: str, labels: dict, value: float):
+    with _lock:
+        key = _key(name, labels)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+def cached_prompt_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prefix cache, 0 when it does not say."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def record_usage(model: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False,
+                 cached_tokens: int = 0) -> float:
+    """Count a chat/embedding call's tokens and its estimated cost in USD. Returns the cost.
+    `cached_tokens` (part of `prompt_tokens`) is counted on its own as well."""
+    if not _enabled:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+    _increment("content_agent_tokens_total", {"model": model, "type": "prompt"}, prompt_tokens)
+    _increment("content_agent_tokens_total", {"model": model, "type": "completion"}, completion_tokens)
+    if cached_tokens:
+        _increment("content_agent_tokens_total", {"model": model, "type": "cached_prompt"}, cached_tokens)
+    _increment("content_agent_cost_usd_total", {"model": model}, cost)
+    current = _current.get()
+    if current is not None:
+        current.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cached_tokens=cached_tokens,
+                    cost_usd=round(cost, 6), tokens_estimated=estimated)
+    return cost
+
+
+def record_image(model: str, size: str) -> float:
+    if not _enabled:
+        return 0.0
+    cost = IMAGE_PRICES.get((model, size), 0.0)
+    _increment("content_agent_images_total", {"model": model, "size": size})
+    _increment("content_agent_cost_usd_total", {"model": model}, cost)
+    current = _current.get()
+    if current is not None:
+        current.set(cost_usd=cost)
+    return cost
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def metrics_text() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: ([*value[0]], value[1], value[2]) for key, value in _histograms.items()}
+    lines = []
+    seen_types = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen_types:
+            lines.append(f"# TYPE {name} counter")
+            seen_types.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        if name not in seen_types:
+            lines.append(f"# TYPE {name} histogram")
+            seen_types.add(name)
+        for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {bucket_count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str = METRICS_PATH):
+    """Write the metrics file for a node_exporter textfile collector (or a human) to pick up."""
+    if not _enabled:
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(metrics_text())
+    os.replace(path + ".tmp", path)
+
+
+atexit.register(write_metrics)
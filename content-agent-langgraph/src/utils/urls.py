@@ -0,0 +1,48 @@
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only track where a visitor came from; they never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_hsenc", "_hsmi", "ref", "igshid"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+INDEX_PAGES = ("index.html", "index.htm", "index.php")
+
+
+def canonicalize(url: str, base: str = None):
+    """Canonical form of `url` (resolved against `base`), or None if it is not an http(s) page.
+
+    `/page`, `/page/`, `/page#section`, `/page?utm_source=x` and `/page/index.html` all map to
+    the same string: scheme and host lower-cased, default port, fragment, tracking parameters
+    and trailing slash dropped, remaining query parameters sorted.
+    """
+    if base is not None:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    netloc = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    for index_page in INDEX_PAGES:
+        if path.endswith("/" + index_page):
+            path = path[:-len(index_page)]
+            break
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES))
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def host_of(url: str) -> str:
+    """Host (and non-default port) of an already canonical URL, without re-parsing it fully."""
+    return url.split("://", 1)[-1].split("/", 1)[0]
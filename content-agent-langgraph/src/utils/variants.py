@@ -0,0 +1,110 @@
+import json
+import re
+
+# Hard limits enforced by each network, in characters
+PLATFORM_LIMITS = {"twitter": 280, "linkedin": 3000, "facebook": 63206, "instagram": 2200}
+INSTAGRAM_MAX_HASHTAGS = 30
+HASHTAG = re.compile(r"#\w+")
+
+# What each variant should look like; the tweet target leaves headroom under the hard limit
+PLATFORM_GUIDES = {
+    "twitter": "a tweet of at most 260 characters, including one or two hashtags",
+    "linkedin": "a professional LinkedIn post: a hook line of at most 250 characters, then an 80–150 word body in a simple, authoritative tone",
+    "facebook": "a friendly Facebook post of 40–80 words that ends with a call to action",
+    "instagram": "an Instagram caption of 50–100 words, followed by a line of 5–10 relevant hashtags",
+}
+
+# Laid out like CAPTION_PROMPT: the shared context first, the per-call parts last
+VARIANTS_PROMPT = """
+You are a B2B tech content strategist. Based on the contextual content below, write one post about the topic at the end for each platform listed there.
+
+Context from website content:
+{context}
+
+Platforms:
+{guides}
+
+Return a JSON object with exactly these keys: {keys}. Each value is the finished post text for that platform.
+
+Topic: {topic}
+"""
+
+FIX_PROMPT = """
+This {platform} post was rejected because {problem}:
+
+{text}
+
+Rewrite it as {guide}, keeping its message.
+Return a JSON object with the single key "{platform}".
+"""
+
+# Models that reject response_format={"type": "json_object"}; the prompt alone asks them for JSON
+JSON_MODE_UNSUPPORTED = ("gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-4-32k", "gpt-4-32k-0613")
+
+
+def supports_json_mode(model: str) -> bool:
+    return model not in JSON_MODE_UNSUPPORTED
+
+
+def build_variants_prompt(topic: str, context: str, platforms: list) -> str:
+    guides = "\n".join(f"- {platform}: {PLATFORM_GUIDES[platform]}" for platform in platforms)
+    keys = ", ".join(f'"{platform}"' for platform in platforms)
+    return VARIANTS_PROMPT.format(guides=guides, topic=topic, context=context, keys=keys)
+
+
+def build_fix_prompt(platform: str, text: str, problem: str) -> str:
+    return FIX_PROMPT.format(platform=platform, problem=problem, text=text or "(missing)",
+                             guide=PLATFORM_GUIDES[platform])
+
+
+def parse_variants(output: str) -> dict:
+    """The JSON object in a completion → {platform: text}. Tolerates a ```json fence or
+    prose around the object; raises ValueError when there is no usable object."""
+    start, end = output.find("{"), output.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in completion")
+    data = json.loads(output[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("completion is not a JSON object")
+    return {str(key).lower(): value.strip() for key, value in data.items() if isinstance(value, str)}
+
+
+def variant_problem(platform: str, text: str):
+    """Why `text` cannot be posted to `platform` as is, or None if it can."""
+    if not text:
+        return "it is missing"
+    limit = PLATFORM_LIMITS.get(platform)
+    if limit and len(text) > limit:
+        return f"it is {len(text)} characters, over the {limit}-character limit"
+    if platform == "instagram":
+        hashtags = len(HASHTAG.findall(text))
+        if not hashtags:
+            return "it has no hashtags"
+        if hashtags > INSTAGRAM_MAX_HASHTAGS:
+            return f"it has {hashtags} hashtags, over the limit of {INSTAGRAM_MAX_HASHTAGS}"
+    return None
+
+
+def pick_variants(candidates: list, platforms: list):
+    """Take each platform's first valid variant across the candidates.
+
+    Returns (variants, problems): `problems` maps each platform without a valid variant to
+    (its first candidate text, what is wrong with it), ready for a targeted re-request.
+    """
+    variants, problems = {}, {}
+    for platform in platforms:
+        texts = [candidate.get(platform, "") for candidate in candidates] or [""]
+        valid = [text for text in texts if variant_problem(platform, text) is None]
+        if valid:
+            variants[platform] = valid[0]
+        else:
+            problems[platform] = (texts[0], variant_problem(platform, texts[0]))
+    return variants, problems
+
+
+def fit_variant(platform: str, text: str) -> str:
+    """Last resort for a variant that is still too long: cut it at a word boundary."""
+    limit = PLATFORM_LIMITS.get(platform)
+    if not limit or len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(" ", 1)[0].rstrip(",;:-") + "…"
@@ -1,22 +1,8 @@
 import os
 import requests
-import json
 from dotenv import load_dotenv
 from typing import Optional
-from bs4 import BeautifulSoup
-# LangChain imports
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.vectorstores import FAISS
-from langchain.schema import Document
-import openai
-from langchain.document_loaders import WebBaseLoader
-from langchain.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-# Social media APIs
-import tweepy
+# The OpenAI SDK is imported where it is used; it dominates start-up time otherwise
 
 # Load environment variables
 load_dotenv()
@@ -34,65 +20,27 @@ LINKEDIN_ORGANIZATION_ID = os.getenv("LINKEDIN_ORGANIZATION_ID")
 TWITTER_BEARER_TOKEN= os.getenv("TWITTER_BEARER_TOKEN")
 
 # Helper: Retrieve web content and build retriever 
-
-from urllib.parse import urljoin, urlparse
-import time
-
-def is_valid_url(url, domain):
-    return urlparse(url).netloc == urlparse(domain).netloc
-
-def crawl_website(start_url, max_pages=20):
-    visited = set()
-    to_visit = [start_url]
-    pages = []
-
-    while to_visit and len(visited) < max_pages:
-        url = to_visit.pop(0)
-        if url in visited:
-            continue
-        try:
-            response = requests.get(url, timeout=10)
-            visited.add(url)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                text = soup.get_text(separator=' ', strip=True)
-                pages.append({"url": url, "content": text})
-
-                for link in soup.find_all('a', href=True):
-                    full_url = urljoin(url, link['href'])
-                    if is_valid_url(full_url, start_url) and full_url not in visited:
-                        to_visit.append(full_url)
-
-                time.sleep(1)  # be respectful of rate limits
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-
-    return pages
+# The crawler engine is shared with the LangGraph agent
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "content-agent-langgraph", "src"))
+from utils.crawler import crawl_website
+from utils.crawl_store import CrawlStore
+from utils.docstore import DocStore
+from utils.retrieval import build_or_load_index, RETRIEVAL_TOP_K
+from utils.pipeline import Pipeline
+from utils.prompts import build_caption_prompt
 
 
 # Generate caption using LangChain RAG pipeline
 def generate_caption_and_content(topic, retrieved_docs):
+    import openai
     openai.api_key = os.getenv("OPENAI_API_KEY")
 
     # Combine retrieved content
     context = "\n\n".join([f"{i+1}. {doc.page_content}" for i, doc in enumerate(retrieved_docs[:5])])
 
-    # Prompt for generation
-    prompt = f"""
-You are a B2B tech content strategist. Based on the topic and contextual content below, write:
-
-1. A professional LinkedIn **caption** (max 250 characters) designed to spark interest.
-2. A concise and informative **LinkedIn post body** (80–150 words) written in simple, authoritative tone.
-
-Topic: {topic}
-
-Context from website content:
-{context}
-
-Format:
-CAPTION: <caption here>
-CONTENT: <content here>
-"""
+    # Prompt for generation: shared layout, topic last so the prefix can be cached
+    prompt = build_caption_prompt(topic, context)
 
     response = openai.ChatCompletion.create(
         model="gpt-4o",
@@ -116,6 +64,7 @@ CONTENT: <content here>
 
 #Image Generation
 def generate_image(prompt: str) -> str:
+    import openai
     try:
         response = openai.images.generate(
             model="dall-e-3",  # Use "dall-e-2" if you don't have access to 3
@@ -267,14 +216,23 @@ def create_post(image_asset_urn, text):
     post_response.raise_for_status()
     return post_response.json()"""
 # Main script
+def load_index():
+    retrieved_docs = DocStore.from_pages(crawl_website("https://cloudjune.com", store=CrawlStore()))
+    return build_or_load_index(retrieved_docs)
+
 if __name__ == "__main__":
-    retrieved_docs = [
-    type("Doc", (object,), {"page_content": page["content"], "metadata": {"source": page["url"]}})
-    for page in crawl_website("https://cloudjune.com")]
-    topic = input("What do you want to post about today? ")
-    caption = generate_caption_and_content(topic, retrieved_docs)
+    # The crawl and index load run in the background while the topic is typed
+    pipeline = Pipeline()
+    pipeline.add("index", load_index)
+    topic = pipeline.run_inline("topic", input, "What do you want to post about today? ")
+    pipeline.add("caption", lambda index, topic: generate_caption_and_content(topic, index.search(topic, RETRIEVAL_TOP_K)),
+                 deps=("index", "topic"))
+    pipeline.add("image", lambda caption: generate_image(caption), deps=("caption",))
+    caption = pipeline.result("caption")
+    image_url = pipeline.result("image")
+    pipeline.report()
+    pipeline.shutdown()
     print("\nGenerated caption:\n", caption)
-    image_url = generate_image(caption)
     confirm = input("Do you want to proceed with posting? (y/n): ").lower()
     if confirm != 'y':
         print("Aborted.")